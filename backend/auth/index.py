@@ -1,12 +1,76 @@
 import json
 import os
-import hashlib
-from typing import Dict, Any
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+import cache
+import passwords
+import ratelimit
+import session
+
+def rate_limited_response() -> Dict[str, Any]:
+    return {
+        'statusCode': 429,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Retry-After': '60'
+        },
+        'body': json.dumps({'error': 'Too many attempts, try again later'}),
+        'isBase64Encoded': False
+    }
+
+def kdf_busy_response() -> Dict[str, Any]:
+    return {
+        'statusCode': 503,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Retry-After': '1'
+        },
+        'body': json.dumps({'error': 'Server is busy, try again later'}),
+        'isBase64Encoded': False
+    }
+
+USER_CACHE_SIZE = 5000
+USER_CACHE_TTL = 300
+MAX_BATCH_USERS = 500
+MAX_EMAIL_LENGTH = 255
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Публичные поля пользователей (id, username, name) — LRU с TTL на процесс
+_user_cache: 'OrderedDict[int, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+
+def cached_users(ids: List[int]) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+    now = time.monotonic()
+    found = {}
+    missing = []
+    for user_id in ids:
+        entry = _user_cache.get(user_id)
+        if entry and entry[0] > now:
+            _user_cache.move_to_end(user_id)
+            found[user_id] = entry[1]
+        else:
+            if entry:
+                del _user_cache[user_id]
+            missing.append(user_id)
+    return found, missing
+
+def remember_users(users: List[Dict[str, Any]]) -> None:
+    expires_at = time.monotonic() + USER_CACHE_TTL
+    for user in users:
+        _user_cache[user['id']] = (expires_at, user)
+        _user_cache.move_to_end(user['id'])
+    while len(_user_cache) > USER_CACHE_SIZE:
+        _user_cache.popitem(last=False)
+
+def invalidate_users(ids: List[int]) -> None:
+    for user_id in ids:
+        _user_cache.pop(user_id, None)
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
@@ -25,13 +89,62 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
             'isBase64Encoded': False
         }
     
+    database_url = os.environ.get('DATABASE_URL')
+    
+    if method == 'GET' and action == 'get_users':
+        try:
+            ids = list(dict.fromkeys(int(i) for i in query_params.get('ids', '').split(',') if i.strip()))
+        except ValueError:
+            ids = []
+        
+        if not ids or len(ids) > MAX_BATCH_USERS:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': f'ids must contain 1 to {MAX_BATCH_USERS} user ids'}),
+                'isBase64Encoded': False
+            }
+        
+        found, missing = cached_users(ids)
+        
+        if missing:
+            conn = psycopg2.connect(database_url)
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(
+                "SELECT id, username, name FROM t_p96553691_freelance_platform_c.users WHERE id = ANY(%s)",
+                (missing,)
+            )
+            rows = [dict(row) for row in cur.fetchall()]
+            cur.close()
+            conn.close()
+            
+            remember_users(rows)
+            for row in rows:
+                found[row['id']] = row
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'users': [found[user_id] for user_id in ids if user_id in found],
+                'missing': [user_id for user_id in ids if user_id not in found]
+            }),
+            'isBase64Encoded': False
+        }
+    
     if method == 'GET' and action == 'get_user':
         user_id = query_params.get('user_id')
         
@@ -49,16 +162,25 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         conn = psycopg2.connect(database_url)
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
-        cur.execute(
-            "SELECT id, username, name, email, created_at FROM t_p96553691_freelance_platform_c.users WHERE id = %s",
-            (int(user_id),)
-        )
-        user = cur.fetchone()
+        def load_user() -> str:
+            cur.execute(
+                "SELECT id, username, name, email, created_at FROM t_p96553691_freelance_platform_c.users WHERE id = %s",
+                (int(user_id),)
+            )
+            user = cur.fetchone()
+            if not user:
+                return ''
+            user_dict = dict(user)
+            user_dict['created_at'] = user_dict['created_at'].isoformat() if user_dict.get('created_at') else None
+            return json.dumps({'user': user_dict})
+        
+        # Пустая строка — пользователь не найден; версия 'user:<id>' увеличивается в update_profile
+        body = cache.get_or_compute(cur, [f'user:{int(user_id)}'], f'user:{int(user_id)}', USER_CACHE_TTL, load_user)
         
         cur.close()
         conn.close()
         
-        if not user:
+        if not body:
             return {
                 'statusCode': 404,
                 'headers': {
@@ -69,16 +191,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'isBase64Encoded': False
             }
         
-        user_dict = dict(user)
-        user_dict['created_at'] = user_dict['created_at'].isoformat() if user_dict.get('created_at') else None
-        
         return {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({'user': user_dict}),
+            'body': body,
             'isBase64Encoded': False
         }
     
@@ -99,8 +218,6 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     else:
         body_data = json.loads(body_raw)
     
-    database_url = os.environ.get('DATABASE_URL')
-    
     if action == 'register':
         username = body_data.get('username', '').strip()
         password = body_data.get('password', '').strip()
@@ -129,9 +246,20 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'isBase64Encoded': False
             }
         
+        limit_keys = [('register_ip', ratelimit.client_ip(event))]
+        if not ratelimit.allow_local(limit_keys):
+            return rate_limited_response()
+        
         conn = psycopg2.connect(database_url)
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
+        allowed = ratelimit.allow_shared(cur, limit_keys)
+        conn.commit()
+        if not allowed:
+            cur.close()
+            conn.close()
+            return rate_limited_response()
+        
         cur.execute("SELECT id FROM t_p96553691_freelance_platform_c.users WHERE username = %s", (username,))
         existing_user = cur.fetchone()
         
@@ -148,7 +276,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'isBase64Encoded': False
             }
         
-        password_hash = hash_password(password)
+        try:
+            password_hash = passwords.hash_password(password)
+        except passwords.KdfBusy:
+            cur.close()
+            conn.close()
+            return kdf_busy_response()
+        
         google_id_value = f'local_{username}'
         email_value = email if email else f'{username}@local.user'
         
@@ -179,7 +313,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             },
             'body': json.dumps({
                 'success': True,
-                'user': user_dict
+                'user': user_dict,
+                'token': session.issue_token(user_dict['id'])
             }),
             'isBase64Encoded': False
         }
@@ -199,22 +334,54 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'isBase64Encoded': False
             }
         
+        limit_keys = [('login_user', username.lower()), ('login_ip', ratelimit.client_ip(event))]
+        if not ratelimit.allow_local(limit_keys):
+            return rate_limited_response()
+        
         conn = psycopg2.connect(database_url)
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
-        password_hash = hash_password(password)
+        allowed = ratelimit.allow_shared(cur, limit_keys)
+        conn.commit()
+        if not allowed:
+            cur.close()
+            conn.close()
+            return rate_limited_response()
         
         cur.execute(
-            "SELECT id, username, name, email, created_at FROM t_p96553691_freelance_platform_c.users "
-            "WHERE username = %s AND password_hash = %s",
-            (username, password_hash)
+            "SELECT id, username, name, email, created_at, password_hash FROM t_p96553691_freelance_platform_c.users "
+            "WHERE username = %s",
+            (username,)
         )
         user = cur.fetchone()
         
+        try:
+            valid, needs_rehash = passwords.verify_password(
+                password, user['password_hash'] if user else passwords.DUMMY_HASH
+            )
+            valid = valid and user is not None
+        except passwords.KdfBusy:
+            cur.close()
+            conn.close()
+            return kdf_busy_response()
+        
+        # Пароль уже проверен: если пул занят, хеш обновится при следующем входе
+        if valid and needs_rehash:
+            try:
+                new_hash = passwords.hash_password(password)
+            except passwords.KdfBusy:
+                new_hash = None
+            if new_hash:
+                cur.execute(
+                    "UPDATE t_p96553691_freelance_platform_c.users SET password_hash = %s WHERE id = %s",
+                    (new_hash, user['id'])
+                )
+                conn.commit()
+        
         cur.close()
         conn.close()
         
-        if not user:
+        if not valid:
             return {
                 'statusCode': 401,
                 'headers': {
@@ -226,6 +393,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             }
         
         user_dict = dict(user)
+        del user_dict['password_hash']
         user_dict['created_at'] = user_dict['created_at'].isoformat() if user_dict.get('created_at') else None
         
         return {
@@ -236,11 +404,120 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             },
             'body': json.dumps({
                 'success': True,
-                'user': user_dict
+                'user': user_dict,
+                'token': session.issue_token(user_dict['id'])
             }),
             'isBase64Encoded': False
         }
     
+    if action == 'update_profile':
+        conn = psycopg2.connect(database_url)
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        user_id = session.authenticate(cur, event.get('headers'))
+        if not user_id:
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 401,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'Unauthorized'}),
+                'isBase64Encoded': False
+            }
+        
+        name = (body_data.get('name') or '').strip()
+        email = (body_data.get('email') or '').strip()
+        if email and (len(email) > MAX_EMAIL_LENGTH or not EMAIL_PATTERN.match(email)):
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'Invalid email'}),
+                'isBase64Encoded': False
+            }
+        
+        try:
+            cur.execute(
+                "UPDATE t_p96553691_freelance_platform_c.users "
+                "SET name = COALESCE(NULLIF(%s, ''), name), email = COALESCE(NULLIF(%s, ''), email) "
+                "WHERE id = %s RETURNING id, username, name, email, created_at",
+                (name, email, user_id)
+            )
+            user = cur.fetchone()
+            # Имя пользователя показывается в ленте заказов и списке фрилансеров
+            cache.bump(cur, f'user:{user_id}', 'orders', 'freelancers')
+            conn.commit()
+        except psycopg2.IntegrityError:
+            conn.rollback()
+            return {
+                'statusCode': 409,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'Email already in use'}),
+                'isBase64Encoded': False
+            }
+        finally:
+            cur.close()
+            conn.close()
+        
+        invalidate_users([user_id])
+        
+        if not user:
+            return {
+                'statusCode': 404,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'User not found'}),
+                'isBase64Encoded': False
+            }
+        
+        user_dict = dict(user)
+        user_dict['created_at'] = user_dict['created_at'].isoformat() if user_dict.get('created_at') else None
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'success': True, 'user': user_dict}),
+            'isBase64Encoded': False
+        }
+    
+    if action == 'logout':
+        token = session.header_value(event.get('headers') or {}, session.TOKEN_HEADER)
+        if token:
+            conn = psycopg2.connect(database_url)
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                payload = session.verify_token(cur, token)
+                if payload:
+                    session.revoke(cur, payload)
+                    conn.commit()
+            finally:
+                cur.close()
+                conn.close()
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'success': True}),
+            'isBase64Encoded': False
+        }
+    
     return {
         'statusCode': 404,
         'headers': {
@@ -0,0 +1,93 @@
+"""Хеширование паролей через scrypt в ограниченном пуле потоков.
+
+Хеш хранится вместе с параметрами: scrypt$<n>$<r>$<p>$<salt_b64>$<hash_b64>,
+поэтому параметры можно усиливать через окружение без миграции — старые хеши
+проверяются со своими параметрами и пересчитываются при следующем входе.
+Старые хеши (несолёный SHA-256, 64 hex-символа) тоже принимаются и подлежат замене.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Tuple
+
+SCRYPT_N = int(os.environ.get('KDF_SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.environ.get('KDF_SCRYPT_R', 8))
+SCRYPT_P = int(os.environ.get('KDF_SCRYPT_P', 1))
+HASH_LEN = 32
+SALT_LEN = 16
+
+KDF_WORKERS = int(os.environ.get('KDF_WORKERS', 2))
+KDF_QUEUE = int(os.environ.get('KDF_QUEUE', 16))
+KDF_TIMEOUT = float(os.environ.get('KDF_TIMEOUT', 5))
+
+_pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix='kdf')
+_slots = threading.BoundedSemaphore(KDF_WORKERS + KDF_QUEUE)
+
+
+class KdfBusy(Exception):
+    '''Пул хеширования переполнен — запрос нужно отклонить, а не ставить в очередь.'''
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r * p, dklen=HASH_LEN
+    )
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise KdfBusy()
+    try:
+        future = _pool.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=KDF_TIMEOUT)
+    except FutureTimeout:
+        raise KdfBusy()
+
+
+def _encode(salt: bytes, digest: bytes, n: int, r: int, p: int) -> str:
+    salt_b64 = base64.b64encode(salt).decode()
+    digest_b64 = base64.b64encode(digest).decode()
+    return f'scrypt${n}${r}${p}${salt_b64}${digest_b64}'
+
+
+# Хеш для несуществующих логинов: проверка стоит столько же, сколько для настоящего
+# пользователя, и не совпадает ни с одним паролем
+DUMMY_HASH = _encode(b'\0' * SALT_LEN, b'\0' * HASH_LEN, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def hash_password(password: str) -> str:
+    salt = os.urandom(SALT_LEN)
+    digest = _run(_scrypt, password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return _encode(salt, digest, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def verify_password(password: str, stored: str) -> Tuple[bool, bool]:
+    '''Возвращает (пароль верный, хеш нужно пересчитать с текущими параметрами).'''
+    if not stored:
+        return False, False
+
+    if not stored.startswith('scrypt$'):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored), True
+
+    try:
+        _, n, r, p, salt_b64, digest_b64 = stored.split('$')
+        n, r, p = int(n), int(r), int(p)
+        salt = base64.b64decode(salt_b64)
+        expected = base64.b64decode(digest_b64)
+    except ValueError:
+        return False, False
+
+    digest = _run(_scrypt, password, salt, n, r, p)
+    if not hmac.compare_digest(digest, expected):
+        return False, False
+    return True, (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
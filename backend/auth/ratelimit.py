@@ -0,0 +1,96 @@
+"""Ограничение частоты входа и регистрации: token bucket по логину и IP.
+
+Первый уровень — корзины в памяти процесса: при их исчерпании запрос
+отклоняется без обращения к БД. Второй уровень — общая UNLOGGED-таблица
+auth_rate_limits, все ключи запроса списываются одним upsert-ом.
+"""
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+SCHEMA = 't_p96553691_freelance_platform_c'
+LOCAL_BUCKETS_LIMIT = 10000
+PRUNE_PROBABILITY = 0.001
+
+# scope -> (ёмкость корзины, пополнение в токенах за секунду)
+LIMITS = {
+    'login_user': (5, 5 / 60),
+    'login_ip': (20, 20 / 60),
+    'register_ip': (5, 5 / 3600),
+}
+
+_local: 'OrderedDict[str, List[float]]' = OrderedDict()
+
+
+def client_ip(event: Dict[str, Any]) -> str:
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    if identity.get('sourceIp'):
+        return identity['sourceIp']
+    headers = event.get('headers') or {}
+    forwarded = headers.get('X-Forwarded-For') or headers.get('x-forwarded-for') or ''
+    return forwarded.split(',')[0].strip() or 'unknown'
+
+
+def _take_local(key: str, capacity: float, rate: float, now: float) -> bool:
+    bucket = _local.get(key)
+    if bucket is None:
+        bucket = [capacity, now]
+        _local[key] = bucket
+        if len(_local) > LOCAL_BUCKETS_LIMIT:
+            _local.popitem(last=False)
+    else:
+        _local.move_to_end(key)
+        bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+    if bucket[0] < 1:
+        return False
+    bucket[0] -= 1
+    return True
+
+
+def allow_local(keys: List[Tuple[str, str]]) -> bool:
+    '''Проверка в памяти процесса. keys — пары (scope, значение).'''
+    now = time.monotonic()
+    allowed = True
+    for scope, value in keys:
+        capacity, rate = LIMITS[scope]
+        allowed = _take_local(f'{scope}:{value}', capacity, rate, now) and allowed
+    return allowed
+
+
+def allow_shared(cur, keys: List[Tuple[str, str]]) -> bool:
+    '''Проверка в общей таблице: один upsert на все ключи. Вызывающий делает commit.'''
+    values = []
+    params = []
+    for scope, value in keys:
+        capacity, rate = LIMITS[scope]
+        values.append('(%s, %s, %s, %s, NOW())')
+        params.extend([f'{scope}:{value}', capacity - 1, capacity, rate])
+
+    # Отклонённый запрос не меняет строку: накопленное пополнение сохраняется, как и в
+    # корзинах процесса. Списание сдвигает updated_at на NOW() - по нему видно, что ключ пропущен
+    cur.execute(f"""
+        INSERT INTO {SCHEMA}.auth_rate_limits AS rl (key, tokens, capacity, rate, updated_at)
+        VALUES {', '.join(values)}
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = CASE
+                WHEN LEAST(EXCLUDED.capacity, rl.tokens + EXTRACT(EPOCH FROM NOW() - rl.updated_at) * EXCLUDED.rate) >= 1
+                THEN LEAST(EXCLUDED.capacity, rl.tokens + EXTRACT(EPOCH FROM NOW() - rl.updated_at) * EXCLUDED.rate) - 1
+                ELSE rl.tokens
+            END,
+            updated_at = CASE
+                WHEN LEAST(EXCLUDED.capacity, rl.tokens + EXTRACT(EPOCH FROM NOW() - rl.updated_at) * EXCLUDED.rate) >= 1
+                THEN NOW()
+                ELSE rl.updated_at
+            END,
+            capacity = EXCLUDED.capacity,
+            rate = EXCLUDED.rate
+        RETURNING rl.updated_at = NOW() AS allowed
+    """, params)
+    allowed = all(row['allowed'] for row in cur.fetchall())
+
+    if random.random() < PRUNE_PROBABILITY:
+        cur.execute(f"DELETE FROM {SCHEMA}.auth_rate_limits WHERE updated_at < NOW() - INTERVAL '1 day'")
+
+    return allowed
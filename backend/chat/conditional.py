@@ -0,0 +1,54 @@
+"""Условные GET: слабые ETag из версий данных и ответ 304 до основного запроса.
+
+ETag строится не из тела ответа, а из дешёвого признака изменения (версии
+пространства имён кэша или max(id)/max(updated_at)) и параметров запроса,
+поэтому проверить If-None-Match можно, не выполняя основной запрос.
+"""
+import hashlib
+from typing import Any, Dict, Optional
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _header(headers: Optional[Dict[str, str]], name: str) -> str:
+    for key, value in (headers or {}).items():
+        if key.lower() == name.lower():
+            return value or ''
+    return ''
+
+
+def matches(headers: Optional[Dict[str, str]], etag: str) -> bool:
+    '''Слабое сравнение If-None-Match с текущим ETag.'''
+    value = _header(headers, 'If-None-Match').strip()
+    if not value:
+        return False
+    if value == '*':
+        return True
+    current = etag[2:] if etag.startswith('W/') else etag
+    for candidate in value.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def cache_headers(etag: str, cache_control: str) -> Dict[str, str]:
+    return {
+        'ETag': etag,
+        'Cache-Control': cache_control,
+        'Access-Control-Expose-Headers': 'ETag'
+    }
+
+
+def not_modified(etag: str, cache_control: str) -> Dict[str, Any]:
+    return {
+        'statusCode': 304,
+        'headers': {'Access-Control-Allow-Origin': '*', **cache_headers(etag, cache_control)},
+        'body': '',
+        'isBase64Encoded': False
+    }
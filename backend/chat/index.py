@@ -6,7 +6,14 @@ import boto3
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+import cache
+import conditional
+import fastjson
+import responses
+import session
+
 CHAT_URL = 'https://functions.poehali.dev/860360d2-628f-498b-b4af-a6be44d35b25'
+CHAT_CACHE_CONTROL = 'private, no-cache'
 
 def get_s3():
     return boto3.client(
@@ -35,7 +42,7 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token, If-None-Match',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
@@ -43,35 +50,52 @@ def handler(event: dict, context) -> dict:
         }
 
     headers = event.get('headers', {})
-    user_id_str = headers.get('X-User-Id') or headers.get('x-user-id')
-
-    if not user_id_str:
-        return {
-            'statusCode': 401,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Требуется авторизация'}),
-            'isBase64Encoded': False
-        }
-
-    user_id = int(user_id_str)
     dsn = os.environ.get('DATABASE_URL')
     conn = psycopg2.connect(dsn)
     cur = conn.cursor(cursor_factory=RealDictCursor)
+    user_id = session.authenticate(cur, headers)
 
-    def resp(status, data):
+    if not user_id:
+        cur.close()
+        conn.close()
         return {
-            'statusCode': status,
+            'statusCode': 401,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps(data, default=str),
+            'body': json.dumps({'error': 'Требуется авторизация'}),
             'isBase64Encoded': False
         }
 
+    def resp(status, data, etag=None):
+        return responses.build(
+            status, fastjson.dumps(data), headers,
+            conditional.cache_headers(etag, CHAT_CACHE_CONTROL) if etag else None
+        )
+
     try:
         if method == 'GET':
             query_params = event.get('queryStringParameters') or {}
             action = query_params.get('action', 'list')
 
             if action == 'list':
+                # Признак изменения списка: число чатов, последний чат, последнее сообщение и его правка.
+                # Соединение с orders такое же, как в списке: удаление заказа убирает чат из обоих;
+                # версия 'orders' покрывает смену названия заказа и имён пользователей
+                cur.execute("""
+                    SELECT COUNT(*) AS chats, MAX(c.id) AS last_chat_id,
+                           MAX(last.id) AS last_message_id, MAX(last.edited_at) AS last_edited_at
+                    FROM t_p96553691_freelance_platform_c.chats c
+                    JOIN t_p96553691_freelance_platform_c.orders o ON c.order_id = o.id
+                    LEFT JOIN LATERAL (
+                        SELECT m.id, m.edited_at FROM t_p96553691_freelance_platform_c.messages m
+                        WHERE m.chat_id = c.id ORDER BY m.id DESC LIMIT 1
+                    ) last ON TRUE
+                    WHERE c.client_id = %s OR c.freelancer_id = %s
+                """, (user_id, user_id))
+                validator = cur.fetchone()
+                etag = conditional.make_etag('list', user_id, cache.versions(cur, ['orders']), *validator.values())
+                if conditional.matches(headers, etag):
+                    return conditional.not_modified(etag, CHAT_CACHE_CONTROL)
+
                 cur.execute("""
                     SELECT DISTINCT
                         c.id as chat_id,
@@ -90,16 +114,21 @@ def handler(event: dict, context) -> dict:
                     WHERE c.client_id = %s OR c.freelancer_id = %s
                     ORDER BY last_message_time DESC NULLS LAST
                 """, (user_id, user_id, user_id, user_id))
-                chats = [dict(row) for row in cur.fetchall()]
-                for chat in chats:
-                    if chat.get('last_message_time'):
-                        chat['last_message_time'] = chat['last_message_time'].isoformat()
-                return resp(200, {'chats': chats})
+                return resp(200, {'chats': cur.fetchall()}, etag)
 
             elif action == 'messages':
                 chat_id = query_params.get('chat_id')
                 if not chat_id:
                     return resp(400, {'error': 'chat_id обязателен'})
+                cur.execute("""
+                    SELECT COUNT(*) AS messages, MAX(id) AS last_message_id, MAX(edited_at) AS last_edited_at
+                    FROM t_p96553691_freelance_platform_c.messages
+                    WHERE chat_id = %s
+                """, (int(chat_id),))
+                etag = conditional.make_etag('messages', chat_id, *cur.fetchone().values())
+                if conditional.matches(headers, etag):
+                    return conditional.not_modified(etag, CHAT_CACHE_CONTROL)
+
                 cur.execute("""
                     SELECT m.*, u.name as sender_name
                     FROM t_p96553691_freelance_platform_c.messages m
@@ -107,11 +136,7 @@ def handler(event: dict, context) -> dict:
                     WHERE m.chat_id = %s
                     ORDER BY m.created_at ASC
                 """, (int(chat_id),))
-                messages = [dict(row) for row in cur.fetchall()]
-                for msg in messages:
-                    msg['created_at'] = msg['created_at'].isoformat() if msg.get('created_at') else None
-                    msg['edited_at'] = msg['edited_at'].isoformat() if msg.get('edited_at') else None
-                return resp(200, {'messages': messages})
+                return resp(200, {'messages': cur.fetchall()}, etag)
 
             elif action == 'presign':
                 file_name = query_params.get('file_name', 'file')
@@ -136,7 +161,7 @@ def handler(event: dict, context) -> dict:
                 other_user_id = body.get('other_user_id')
                 if not order_id or not other_user_id:
                     return resp(400, {'error': 'order_id и other_user_id обязательны'})
-                cur.execute("SELECT user_id FROM t_p96553691_freelance_platform_c.orders WHERE id = %s", (order_id,))
+                cur.execute("SELECT user_id FROM t_p96553691_freelance_platform_c.orders WHERE id = %s AND deleted_at IS NULL", (order_id,))
                 order_owner = cur.fetchone()
                 if not order_owner:
                     return resp(404, {'error': 'Заказ не найден'})
@@ -0,0 +1,87 @@
+"""Сборка HTTP-ответов со сжатием тела по Accept-Encoding.
+
+Тела от COMPRESS_MIN_BYTES сжимаются brotli (если модуль установлен) или gzip
+и отдаются в base64 с isBase64Encoded=True — так платформа передаёт бинарное тело.
+Меньшие тела и клиенты без поддержки сжатия получают JSON как есть.
+"""
+import base64
+import gzip
+import os
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _header(headers: Optional[Dict[str, str]], name: str) -> str:
+    for key, value in (headers or {}).items():
+        if key.lower() == name.lower():
+            return value or ''
+    return ''
+
+
+def negotiate(request_headers: Optional[Dict[str, str]]) -> Optional[str]:
+    '''Лучшее поддерживаемое кодирование из Accept-Encoding: br, затем gzip; None — без сжатия.'''
+    accepted = {}
+    for item in _header(request_headers, 'Accept-Encoding').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def encode(body: str, encoding: str) -> str:
+    '''Сжатое тело в base64.'''
+    raw = body.encode()
+    if encoding == 'br':
+        compressed = brotli.compress(raw, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(raw, compresslevel=GZIP_LEVEL)
+    return base64.b64encode(compressed).decode()
+
+
+def build(status: int, body: str, request_headers: Optional[Dict[str, str]],
+          headers: Optional[Dict[str, str]] = None,
+          encoded: Optional[Callable[[str], str]] = None) -> Dict[str, Any]:
+    '''
+    Ответ с готовым JSON-телом. encoded(encoding) может вернуть сжатое тело
+    из кэша вместо повторного сжатия.
+    '''
+    response_headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Vary': 'Accept-Encoding',
+        **(headers or {})
+    }
+    encoding = negotiate(request_headers) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding is None:
+        return {
+            'statusCode': status,
+            'headers': response_headers,
+            'body': body,
+            'isBase64Encoded': False
+        }
+    response_headers['Content-Encoding'] = encoding
+    return {
+        'statusCode': status,
+        'headers': response_headers,
+        'body': encoded(encoding) if encoded else encode(body, encoding),
+        'isBase64Encoded': True
+    }
@@ -0,0 +1,214 @@
+"""Подписанные сессионные токены: выпуск в auth и проверка во всех функциях без запросов в БД.
+
+Формат токена: <key_id>.<payload_b64>.<signature_b64>, подпись HMAC-SHA256.
+Ключи задаются в SESSION_KEYS как "kid1:secret1,kid2:secret2", новые токены
+подписываются ключом SESSION_KEY_ID (по умолчанию первым в списке) — для ротации
+достаточно добавить новый ключ, переключить SESSION_KEY_ID и удалить старый
+после истечения выданных им токенов.
+
+Отозванные при выходе токены хранятся в таблице revoked_sessions. Каждый процесс
+держит их копию в памяти и догружает новые записи через соединение обработчика не
+чаще раза в REVOCATION_REFRESH секунд — на это время другие процессы ещё принимают
+только что отозванный токен. Копия ограничена REVOCATION_CACHE_SIZE записями: при
+переполнении процесс проверяет каждый токен запросом по первичному ключу, пока живых
+отзывов не станет вдвое меньше предела. Ошибка БД при проверке отзыва отклоняет токен.
+
+Без действительного токена запрос не авторизуется. На время перехода старый
+заголовок X-User-Id можно временно разрешить, задав SESSION_LEGACY_UNTIL — дату
+(YYYY-MM-DD или ISO 8601 в UTC) или unix-время; после неё заголовок снова
+игнорируется без передеплоя.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import psycopg2
+
+SCHEMA = 't_p96553691_freelance_platform_c'
+TOKEN_HEADER = 'X-Auth-Token'
+LEGACY_HEADER = 'X-User-Id'
+TOKEN_TTL = int(os.environ.get('SESSION_TTL', 7 * 24 * 3600))
+REVOCATION_REFRESH = float(os.environ.get('SESSION_REVOCATION_REFRESH', 5))
+# Запас на транзакции отзыва, зафиксированные позже прошлой догрузки
+REVOCATION_OVERLAP = 60
+REVOCATION_CACHE_SIZE = int(os.environ.get('SESSION_REVOCATION_CACHE_SIZE', 10000))
+
+_keys_cache: Dict[str, Any] = {'raw': None, 'keys': {}}
+_revoked: Dict[str, int] = {}
+_revocation_state: Dict[str, Any] = {'next_check': 0.0, 'since': None, 'lookup': False}
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+def _keys() -> Dict[str, bytes]:
+    raw = os.environ.get('SESSION_KEYS', '')
+    if raw != _keys_cache['raw']:
+        keys = {}
+        for item in raw.split(','):
+            kid, _, secret = item.strip().partition(':')
+            if kid and secret:
+                keys[kid] = secret.encode()
+        _keys_cache['raw'] = raw
+        _keys_cache['keys'] = keys
+    return _keys_cache['keys']
+
+
+def _sign(key: bytes, signing_input: str) -> str:
+    return _b64encode(hmac.new(key, signing_input.encode(), hashlib.sha256).digest())
+
+
+def issue_token(user_id: int, ttl: int = TOKEN_TTL) -> Optional[str]:
+    '''Выпускает токен для пользователя; None, если ключи подписи не настроены.'''
+    keys = _keys()
+    if not keys:
+        return None
+    kid = os.environ.get('SESSION_KEY_ID') or next(iter(keys))
+    if kid not in keys:
+        return None
+    payload = {'uid': int(user_id), 'exp': int(time.time()) + ttl, 'jti': uuid.uuid4().hex[:16]}
+    payload_b64 = _b64encode(json.dumps(payload, separators=(',', ':')).encode())
+    signing_input = f'{kid}.{payload_b64}'
+    return f'{signing_input}.{_sign(keys[kid], signing_input)}'
+
+
+def verify_token(cur, token: str) -> Optional[Dict[str, Any]]:
+    '''
+    Проверяет подпись, срок действия и отзыв токена. Возвращает payload или None.
+    Отзыв проверяется через cur (RealDictCursor обработчика); при ошибке БД
+    транзакция откатывается и токен не принимается.
+    '''
+    parts = token.split('.')
+    if len(parts) != 3:
+        return None
+    kid, payload_b64, signature = parts
+    key = _keys().get(kid)
+    if not key:
+        return None
+    if not hmac.compare_digest(_sign(key, f'{kid}.{payload_b64}'), signature):
+        return None
+    try:
+        payload = json.loads(_b64decode(payload_b64))
+    except ValueError:
+        return None
+    if payload.get('exp', 0) < time.time():
+        return None
+    try:
+        if is_revoked(cur, payload):
+            return None
+    except psycopg2.Error:
+        cur.connection.rollback()
+        return None
+    return payload
+
+
+def _refresh_revoked(cur) -> None:
+    now = time.monotonic()
+    if now < _revocation_state['next_check']:
+        return
+    cur.execute("SELECT EXTRACT(EPOCH FROM NOW())::bigint AS now")
+    db_now = cur.fetchone()['now']
+    if _revocation_state['lookup']:
+        cur.execute(f"""
+            SELECT COUNT(*) AS live FROM (
+                SELECT 1 FROM {SCHEMA}.revoked_sessions WHERE exp > %s LIMIT %s
+            ) live
+        """, (db_now, REVOCATION_CACHE_SIZE // 2 + 1))
+        if cur.fetchone()['live'] > REVOCATION_CACHE_SIZE // 2:
+            _revocation_state['next_check'] = now + REVOCATION_REFRESH
+            return
+        _revocation_state['lookup'] = False
+        _revocation_state['since'] = None
+    since = _revocation_state['since']
+    cur.execute(f"""
+        SELECT jti, exp FROM {SCHEMA}.revoked_sessions
+        WHERE exp > %s AND (%s::bigint IS NULL OR revoked_at > %s::bigint)
+        LIMIT %s
+    """, (db_now, since, since, REVOCATION_CACHE_SIZE + 1))
+    rows = cur.fetchall()
+    for jti in [j for j, exp in _revoked.items() if exp < db_now]:
+        del _revoked[jti]
+    _revoked.update((row['jti'], row['exp']) for row in rows)
+    if len(_revoked) > REVOCATION_CACHE_SIZE:
+        _revoked.clear()
+        _revocation_state['lookup'] = True
+    else:
+        _revocation_state['since'] = db_now - REVOCATION_OVERLAP
+    _revocation_state['next_check'] = now + REVOCATION_REFRESH
+
+
+def is_revoked(cur, payload: Dict[str, Any]) -> bool:
+    _refresh_revoked(cur)
+    if _revocation_state['lookup']:
+        cur.execute(
+            f"SELECT 1 FROM {SCHEMA}.revoked_sessions WHERE jti = %s",
+            (payload.get('jti'),)
+        )
+        return cur.fetchone() is not None
+    return payload.get('jti') in _revoked
+
+
+def revoke(cur, payload: Dict[str, Any]) -> None:
+    '''Отзывает токен для всех функций: запись в revoked_sessions в транзакции cur. Commit делает вызывающий.'''
+    cur.execute(f"""
+        INSERT INTO {SCHEMA}.revoked_sessions (jti, exp, revoked_at)
+        VALUES (%s, %s, EXTRACT(EPOCH FROM NOW())::bigint)
+        ON CONFLICT (jti) DO NOTHING
+    """, (payload['jti'], payload['exp']))
+    cur.execute(
+        f"DELETE FROM {SCHEMA}.revoked_sessions WHERE exp < EXTRACT(EPOCH FROM NOW())::bigint"
+    )
+    if not _revocation_state['lookup'] and len(_revoked) < REVOCATION_CACHE_SIZE:
+        _revoked[payload['jti']] = payload['exp']
+
+
+def header_value(headers: Dict[str, Any], name: str) -> Optional[str]:
+    return headers.get(name) or headers.get(name.lower())
+
+
+def _legacy_deadline() -> Optional[float]:
+    '''Момент окончания переходного периода из SESSION_LEGACY_UNTIL; None - не задан или не разобран.'''
+    raw = os.environ.get('SESSION_LEGACY_UNTIL', '').strip()
+    if not raw:
+        return None
+    if raw.isdigit():
+        return float(raw)
+    try:
+        moment = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _legacy_allowed() -> bool:
+    deadline = _legacy_deadline()
+    return deadline is not None and time.time() < deadline
+
+
+def authenticate(cur, headers: Optional[Dict[str, Any]]) -> Optional[int]:
+    '''
+    Возвращает id пользователя из токена X-Auth-Token или None; cur - курсор обработчика.
+    Старый заголовок X-User-Id принимается только до момента SESSION_LEGACY_UNTIL.
+    '''
+    headers = headers or {}
+    token = header_value(headers, TOKEN_HEADER)
+    if token:
+        payload = verify_token(cur, token)
+        return payload['uid'] if payload else None
+    if not _legacy_allowed():
+        return None
+    legacy = header_value(headers, LEGACY_HEADER)
+    return int(legacy) if legacy and legacy.isdigit() else None
@@ -0,0 +1,119 @@
+"""Журнал событий жизненного цикла заказов (transactional outbox) и его чтение потребителями.
+
+Обработчики пишут событие через emit() в той же транзакции, что и само изменение,
+поэтому событие появляется в журнале ровно тогда, когда изменение зафиксировано.
+
+Позиция события — пара (txid, id). По одному id читать нельзя: BIGSERIAL выдаётся
+при вставке, а не при коммите, и событие с меньшим id может стать видимым позже.
+Потребитель берёт только события транзакций старше txid_snapshot_xmin — все они
+уже завершены, и новые события в этой области позиций не появятся.
+"""
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+SCHEMA = 't_p96553691_freelance_platform_c'
+BATCH_SIZE = 500
+
+ORDER_CREATED = 'order.created'
+ORDER_DELETED = 'order.deleted'
+ORDER_COMPLETED = 'order.completed'
+ORDER_PAID = 'order.paid'
+RESPONSE_CREATED = 'response.created'
+RESPONSE_ACCEPTED = 'response.accepted'
+RESPONSE_REJECTED = 'response.rejected'
+REVIEW_CREATED = 'review.created'
+
+
+def emit(cur, event_type: str, actor_id: Optional[int], items: Iterable[Tuple[Optional[int], Dict[str, Any]]]) -> None:
+    '''Пишет события одним INSERT. items — пары (order_id, payload). Commit делает вызывающий.'''
+    order_ids = []
+    payloads = []
+    for order_id, payload in items:
+        order_ids.append(order_id)
+        payloads.append(json.dumps(payload or {}, default=str))
+    if not order_ids:
+        return
+    cur.execute(f"""
+        INSERT INTO {SCHEMA}.order_events (event_type, order_id, actor_id, payload)
+        SELECT %s, e.order_id, %s, e.payload::jsonb
+        FROM unnest(%s::int[], %s::text[]) AS e(order_id, payload)
+    """, (event_type, actor_id, order_ids, payloads))
+
+
+def consume(conn, consumer: str, handle: Callable[[Any, List[Dict[str, Any]]], None],
+            batch_size: int = BATCH_SIZE, deadline: Optional[float] = None) -> int:
+    '''
+    Читает журнал порциями с позиции потребителя и передаёт их handle(cur, events).
+    handle выполняется в транзакции, которая сдвигает позицию, поэтому проекции в той же БД
+    обновляются ровно один раз. Строка позиции берётся с SKIP LOCKED: второй экземпляр того же
+    потребителя сразу выходит, а не ждёт. Возвращает число обработанных событий.
+    '''
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(
+        f"INSERT INTO {SCHEMA}.event_consumers (name) VALUES (%s) ON CONFLICT (name) DO NOTHING",
+        (consumer,)
+    )
+    conn.commit()
+
+    processed = 0
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            cur.execute(f"""
+                SELECT last_txid, last_id FROM {SCHEMA}.event_consumers
+                WHERE name = %s
+                FOR UPDATE SKIP LOCKED
+            """, (consumer,))
+            position = cur.fetchone()
+            if not position:
+                conn.rollback()
+                break
+
+            cur.execute(f"""
+                SELECT id, txid, event_type, order_id, actor_id, payload, created_at
+                FROM {SCHEMA}.order_events
+                WHERE (txid, id) > (%s, %s)
+                  AND txid < txid_snapshot_xmin(txid_current_snapshot())
+                ORDER BY txid, id
+                LIMIT %s
+            """, (position['last_txid'], position['last_id'], batch_size))
+            batch = [dict(row) for row in cur.fetchall()]
+            if not batch:
+                conn.rollback()
+                break
+
+            handle(cur, batch)
+            cur.execute(f"""
+                UPDATE {SCHEMA}.event_consumers
+                SET last_txid = %s, last_id = %s, updated_at = NOW()
+                WHERE name = %s
+            """, (batch[-1]['txid'], batch[-1]['id'], consumer))
+            conn.commit()
+            processed += len(batch)
+            if len(batch) < batch_size:
+                break
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return processed
+
+
+def lag(cur) -> List[Dict[str, Any]]:
+    '''Отставание потребителей: число непрочитанных событий и возраст самого старого из них.'''
+    cur.execute(f"""
+        SELECT
+            c.name,
+            c.last_id,
+            c.updated_at,
+            COUNT(e.id) AS pending,
+            EXTRACT(EPOCH FROM NOW() - MIN(e.created_at)) AS oldest_pending_seconds
+        FROM {SCHEMA}.event_consumers c
+        LEFT JOIN {SCHEMA}.order_events e ON (e.txid, e.id) > (c.last_txid, c.last_id)
+        GROUP BY c.name, c.last_id, c.updated_at
+        ORDER BY c.name
+    """)
+    return [dict(row) for row in cur.fetchall()]
@@ -1,8 +1,109 @@
+import base64
+import csv
+import io
 import json
 import os
+import re
+from datetime import date
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+import cache
+import events
+import session
+
+MAX_BULK_ORDERS = 10000
+MAX_BUDGET = 2147483647  # предел INTEGER в orders
+BULK_FIELDS = ('title', 'description', 'category', 'budget_min', 'budget_max', 'deadline')
+COPY_LINE = re.compile(r'COPY order_import, line (\d+)')
+
+def read_bulk_rows(event: dict, headers: dict) -> list:
+    '''Строки пакетной загрузки из JSON-массива (или {"orders": [...]}) либо из CSV с заголовком.'''
+    raw = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        raw = base64.b64decode(raw).decode('utf-8')
+    content_type = headers.get('Content-Type') or headers.get('content-type') or ''
+    if 'text/csv' in content_type:
+        return list(csv.DictReader(io.StringIO(raw)))
+    data = json.loads(raw or '[]')
+    return data.get('orders', []) if isinstance(data, dict) else data
+
+def validate_order_row(row) -> tuple:
+    '''Возвращает (нормализованная строка, None) или (None, текст ошибки).'''
+    if not isinstance(row, dict):
+        return None, 'Строка должна быть объектом'
+    title = str(row.get('title') or '').strip()
+    description = str(row.get('description') or '').strip()
+    category = str(row.get('category') or '').strip()
+    if not title or not description or not category:
+        return None, 'Название, описание и категория обязательны'
+    if len(title) > 255 or len(category) > 100:
+        return None, 'Слишком длинное название или категория'
+    try:
+        budget_min = int(row['budget_min']) if row.get('budget_min') not in (None, '') else None
+        budget_max = int(row['budget_max']) if row.get('budget_max') not in (None, '') else None
+        deadline = date.fromisoformat(str(row['deadline'])) if row.get('deadline') not in (None, '') else None
+    except (TypeError, ValueError):
+        return None, 'Неверный формат бюджета или срока'
+    if any(budget is not None and not 0 <= budget <= MAX_BUDGET for budget in (budget_min, budget_max)):
+        return None, 'Неверный формат бюджета или срока'
+    if budget_min is not None and budget_max is not None and budget_min > budget_max:
+        return None, 'Минимальный бюджет больше максимального'
+    return (title, description, category, budget_min, budget_max, deadline), None
+
+def create_orders_bulk(cur, user_id: int, rows: list) -> list:
+    '''COPY валидных строк во временную таблицу и перенос в orders одним INSERT ... SELECT.'''
+    cur.execute("""
+        CREATE TEMP TABLE order_import (
+            row_num INTEGER NOT NULL,
+            id INTEGER NOT NULL DEFAULT nextval(
+                pg_get_serial_sequence('t_p96553691_freelance_platform_c.orders', 'id')::regclass
+            ),
+            title VARCHAR(255) NOT NULL,
+            description TEXT NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            budget_min INTEGER,
+            budget_max INTEGER,
+            deadline DATE
+        ) ON COMMIT DROP
+    """)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row_num, values in rows:
+        writer.writerow((row_num,) + values)
+    buffer.seek(0)
+    cur.copy_expert(
+        "COPY order_import (row_num, title, description, category, budget_min, budget_max, deadline) "
+        "FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+    cur.execute("""
+        INSERT INTO t_p96553691_freelance_platform_c.orders 
+        (id, user_id, title, description, category, budget_min, budget_max, deadline, status)
+        SELECT id, %s, title, description, category, budget_min, budget_max, deadline, 'active'
+        FROM order_import
+    """, (user_id,))
+
+    cur.execute("""
+        INSERT INTO t_p96553691_freelance_platform_c.order_fanout_outbox (order_id)
+        SELECT id FROM order_import ORDER BY row_num
+    """)
+
+    cur.execute("SELECT row_num, id, category FROM order_import ORDER BY row_num")
+    created = [dict(r) for r in cur.fetchall()]
+    events.emit(cur, events.ORDER_CREATED, user_id, [(r['id'], {'category': r.pop('category')}) for r in created])
+    cache.bump(cur, 'orders')
+    return created
+
+def failed_bulk_row(error: psycopg2.Error, rows: list):
+    '''Номер исходной строки, на которой упал COPY (по CONTEXT ошибки); None, если не определить.'''
+    match = COPY_LINE.search(error.diag.context or '') if error.diag else None
+    if match and 0 < int(match.group(1)) <= len(rows):
+        return rows[int(match.group(1)) - 1][0]
+    return None
+
 def handler(event: dict, context) -> dict:
     '''API для создания заказа от авторизованного пользователя'''
     method = event.get('httpMethod', 'POST')
@@ -13,7 +114,7 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
@@ -33,9 +134,12 @@ def handler(event: dict, context) -> dict:
 
     try:
         headers = event.get('headers', {})
-        user_id_str = headers.get('X-User-Id') or headers.get('x-user-id')
+        dsn = os.environ.get('DATABASE_URL')
+        conn = psycopg2.connect(dsn)
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        user_id = session.authenticate(cur, headers)
         
-        if not user_id_str:
+        if not user_id:
             return {
                 'statusCode': 401,
                 'headers': {
@@ -46,7 +150,66 @@ def handler(event: dict, context) -> dict:
                 'isBase64Encoded': False
             }
 
-        user_id = int(user_id_str)
+        query_params = event.get('queryStringParameters') or {}
+        if query_params.get('mode') == 'bulk':
+            rows = read_bulk_rows(event, headers)
+            if not isinstance(rows, list) or not rows or len(rows) > MAX_BULK_ORDERS:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({'error': f'Нужно от 1 до {MAX_BULK_ORDERS} заказов'}),
+                    'isBase64Encoded': False
+                }
+
+            valid_rows = []
+            errors = []
+            for row_num, row in enumerate(rows):
+                values, error = validate_order_row(row)
+                if error:
+                    errors.append({'row': row_num, 'error': error})
+                else:
+                    valid_rows.append((row_num, values))
+
+            created = []
+            if valid_rows:
+                try:
+                    created = create_orders_bulk(cur, user_id, valid_rows)
+                    conn.commit()
+                except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+                    # Пакет атомарен: ни один заказ не создан, указываем строку, которую отвергла БД
+                    conn.rollback()
+                    errors.append({'row': failed_bulk_row(e, valid_rows), 'error': 'Строка отклонена базой данных'})
+                    return {
+                        'statusCode': 400,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({
+                            'success': False,
+                            'created': [],
+                            'errors': errors
+                        }),
+                        'isBase64Encoded': False
+                    }
+
+            return {
+                'statusCode': 201 if created else 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'success': bool(created),
+                    'created': created,
+                    'errors': errors
+                }),
+                'isBase64Encoded': False
+            }
+
         body = json.loads(event.get('body', '{}'))
         
         title = body.get('title', '').strip()
@@ -67,27 +230,30 @@ def handler(event: dict, context) -> dict:
                 'isBase64Encoded': False
             }
 
-        dsn = os.environ.get('DATABASE_URL')
-        conn = psycopg2.connect(dsn)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
+        # Строка очереди рассылки пишется в той же транзакции, что и заказ
         cur.execute(
-            """INSERT INTO t_p96553691_freelance_platform_c.orders 
-            (user_id, title, description, category, budget_min, budget_max, deadline, status) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, 'active') 
-            RETURNING id, user_id, title, description, category, budget_min, budget_max, deadline, status, created_at""",
+            """WITH created AS (
+                INSERT INTO t_p96553691_freelance_platform_c.orders 
+                (user_id, title, description, category, budget_min, budget_max, deadline, status) 
+                VALUES (%s, %s, %s, %s, %s, %s, %s, 'active') 
+                RETURNING id, user_id, title, description, category, budget_min, budget_max, deadline, status, created_at
+            ),
+            queued AS (
+                INSERT INTO t_p96553691_freelance_platform_c.order_fanout_outbox (order_id)
+                SELECT id FROM created
+            )
+            SELECT * FROM created""",
             (user_id, title, description, category, budget_min, budget_max, deadline)
         )
         
         order = cur.fetchone()
+        events.emit(cur, events.ORDER_CREATED, user_id, [(order['id'], {'category': order['category']})])
+        cache.bump(cur, 'orders')
         conn.commit()
         
         order_dict = dict(order)
         order_dict['created_at'] = order_dict['created_at'].isoformat() if order_dict.get('created_at') else None
         order_dict['deadline'] = order_dict['deadline'].isoformat() if order_dict.get('deadline') else None
-        
-        cur.close()
-        conn.close()
 
         return {
             'statusCode': 201,
@@ -113,6 +279,8 @@ def handler(event: dict, context) -> dict:
             'isBase64Encoded': False
         }
     except Exception as e:
+        if 'conn' in locals():
+            conn.rollback()
         return {
             'statusCode': 500,
             'headers': {
@@ -122,3 +290,8 @@ def handler(event: dict, context) -> dict:
             'body': json.dumps({'error': f'Ошибка сервера: {str(e)}'}),
             'isBase64Encoded': False
         }
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
@@ -3,6 +3,10 @@ import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+import cache
+import events
+import session
+
 def handler(event: dict, context) -> dict:
     """Удаление заказа пользователем. Только владелец заказа может его удалить."""
     if event.get('httpMethod') == 'OPTIONS':
@@ -11,7 +15,7 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token',
                 'Access-Control-Max-Age': '86400'
             },
             'body': ''
@@ -24,8 +28,13 @@ def handler(event: dict, context) -> dict:
             'body': json.dumps({'error': 'Method not allowed'})
         }
 
-    user_id = event.get('headers', {}).get('X-User-Id')
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    user_id = session.authenticate(cur, event.get('headers'))
     if not user_id:
+        cur.close()
+        conn.close()
         return {
             'statusCode': 401,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -35,6 +44,8 @@ def handler(event: dict, context) -> dict:
     query_params = event.get('queryStringParameters') or {}
     order_id = query_params.get('order_id')
     if not order_id:
+        cur.close()
+        conn.close()
         return {
             'statusCode': 400,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -42,14 +53,23 @@ def handler(event: dict, context) -> dict:
         }
 
     order_id_int = int(order_id)
-    user_id_int = int(user_id)
-
-    conn = psycopg2.connect(os.environ['DATABASE_URL'])
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    user_id_int = user_id
 
-    cur.execute(
-        f"SELECT id, user_id FROM t_p96553691_freelance_platform_c.orders WHERE id = {order_id_int}"
-    )
+    # Мягкое удаление: отклики, чаты и файлы удаляет фоновая функция purge-orders
+    cur.execute("""
+        WITH target AS (
+            SELECT id, user_id FROM t_p96553691_freelance_platform_c.orders
+            WHERE id = %s AND deleted_at IS NULL
+        ),
+        deleted AS (
+            UPDATE t_p96553691_freelance_platform_c.orders o
+            SET deleted_at = NOW()
+            FROM target t
+            WHERE o.id = t.id AND t.user_id = %s
+            RETURNING o.id
+        )
+        SELECT t.id, t.user_id FROM target t
+    """, (order_id_int, user_id_int))
     order = cur.fetchone()
 
     if not order:
@@ -70,12 +90,8 @@ def handler(event: dict, context) -> dict:
             'body': json.dumps({'error': 'Forbidden: not your order'})
         }
 
-    cur.execute(
-        f"DELETE FROM t_p96553691_freelance_platform_c.order_responses WHERE order_id = {order_id_int}"
-    )
-    cur.execute(
-        f"DELETE FROM t_p96553691_freelance_platform_c.orders WHERE id = {order_id_int}"
-    )
+    events.emit(cur, events.ORDER_DELETED, user_id_int, [(order_id_int, {})])
+    cache.bump(cur, 'orders')
     conn.commit()
     cur.close()
     conn.close()
@@ -6,6 +6,8 @@ import boto3
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+import session
+
 SCHEMA = 't_p96553691_freelance_platform_c'
 
 def get_cdn_url(key):
@@ -28,28 +30,29 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token',
                 'Access-Control-Max-Age': '86400'
             },
             'body': ''
         }
 
     headers = event.get('headers', {})
-    user_id_str = headers.get('X-User-Id') or headers.get('x-user-id')
-    if not user_id_str:
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    user_id = session.authenticate(cur, headers)
+    if not user_id:
+        cur.close()
+        conn.close()
         return {
             'statusCode': 401,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
             'body': json.dumps({'error': 'Требуется авторизация'})
         }
 
-    user_id = int(user_id_str)
     method = event.get('httpMethod', 'GET')
     query_params = event.get('queryStringParameters') or {}
 
-    conn = psycopg2.connect(os.environ['DATABASE_URL'])
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
     if method == 'GET':
         action = query_params.get('action', 'list')
 
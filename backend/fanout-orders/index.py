@@ -0,0 +1,101 @@
+import json
+import os
+import time
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+SCHEMA = 't_p96553691_freelance_platform_c'
+INBOX_BATCH = 5000
+TIME_BUDGET = 20
+
+def fan_out_batch(cur, entry: dict) -> int:
+    '''Следующая порция входящих для заказа: фрилансеры с пересечением навыков, по возрастанию user_id.'''
+    cur.execute(f"""
+        WITH target AS (
+            SELECT o.id, o.user_id,
+                   {SCHEMA}.skill_terms(ARRAY[o.title, o.category, o.description]) AS terms
+            FROM {SCHEMA}.orders o
+            WHERE o.id = %(order_id)s AND o.status = 'active' AND o.deleted_at IS NULL
+        ),
+        matched AS (
+            SELECT f.user_id
+            FROM {SCHEMA}.freelancers f, target t
+            WHERE {SCHEMA}.skill_terms(f.skills) && t.terms
+              AND f.user_id > %(after)s
+              AND f.user_id <> t.user_id
+            ORDER BY f.user_id
+            LIMIT %(batch)s
+        ),
+        inserted AS (
+            INSERT INTO {SCHEMA}.freelancer_inbox (user_id, order_id)
+            SELECT m.user_id, %(order_id)s FROM matched m
+            ON CONFLICT (user_id, order_id) DO NOTHING
+        )
+        SELECT COUNT(*) AS matched, MAX(user_id) AS last_user_id FROM matched
+    """, {'order_id': entry['order_id'], 'after': entry['last_user_id'], 'batch': INBOX_BATCH})
+    result = cur.fetchone()
+
+    if result['matched'] < INBOX_BATCH:
+        cur.execute(f"DELETE FROM {SCHEMA}.order_fanout_outbox WHERE id = %s", (entry['id'],))
+    else:
+        cur.execute(
+            f"UPDATE {SCHEMA}.order_fanout_outbox SET last_user_id = %s WHERE id = %s",
+            (result['last_user_id'], entry['id'])
+        )
+    return result['matched']
+
+def handler(event: dict, context) -> dict:
+    """Рассылка новых заказов во входящие подходящих по навыкам фрилансеров. Запускается по таймеру."""
+    if 'httpMethod' in event:
+        headers = event.get('headers') or {}
+        secret = headers.get('X-Cron-Secret') or headers.get('x-cron-secret')
+        if not os.environ.get('CRON_SECRET') or secret != os.environ['CRON_SECRET']:
+            return {
+                'statusCode': 403,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Forbidden'})
+            }
+
+    deadline = time.monotonic() + TIME_BUDGET
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    totals = {'orders': 0, 'matched_freelancers': 0}
+    done = False
+
+    try:
+        while time.monotonic() < deadline:
+            # Строка блокируется до коммита порции; параллельные воркеры берут другие заказы
+            cur.execute(f"""
+                SELECT id, order_id, last_user_id
+                FROM {SCHEMA}.order_fanout_outbox
+                ORDER BY id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """)
+            entry = cur.fetchone()
+            if not entry:
+                conn.commit()
+                done = True
+                break
+
+            matched = fan_out_batch(cur, entry)
+            conn.commit()
+            totals['matched_freelancers'] += matched
+            if matched < INBOX_BATCH:
+                totals['orders'] += 1
+    except Exception as e:
+        conn.rollback()
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': str(e), **totals})
+        }
+    finally:
+        cur.close()
+        conn.close()
+
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({**totals, 'done': done})
+    }
@@ -0,0 +1,150 @@
+"""Кэш ответов GET: LRU в памяти процесса и необязательный общий уровень в UNLOGGED-таблице.
+
+В ключ записи входят версии пространств имён (таблица cache_versions), от которых
+зависит ответ. Обработчики записи вызывают bump() в своей транзакции: после коммита
+старые записи перестают находиться и вытесняются по LRU/TTL. Версии читаются из БД
+не чаще раза в VERSION_TTL секунд на процесс — на это время другие процессы могут
+отдавать прежний ответ.
+
+Одновременные промахи по одному ключу вычисляет один исполнитель: внутри процесса —
+под одной из LOCK_STRIPES блокировок, выбранной по хэшу ключа, между процессами
+(при CACHE_SHARED=1) — под advisory lock. Набор блокировок фиксирован: разные ключи
+на одной полосе вычисляются по очереди, зато ожидающие одного ключа всегда держат
+одну и ту же блокировку.
+"""
+import os
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+SCHEMA = 't_p96553691_freelance_platform_c'
+LOCAL_SIZE = int(os.environ.get('CACHE_LOCAL_SIZE', 1000))
+VERSION_TTL = float(os.environ.get('CACHE_VERSION_TTL', 2))
+SHARED = os.environ.get('CACHE_SHARED') == '1'
+PRUNE_PROBABILITY = 0.01
+LOCK_STRIPES = 64
+
+_local: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+_versions: Dict[str, Tuple[float, int]] = {}
+_key_locks: List[threading.Lock] = [threading.Lock() for _ in range(LOCK_STRIPES)]
+_stats: Counter = Counter()
+
+
+def _lock_for(key: str) -> threading.Lock:
+    return _key_locks[hash(key) % LOCK_STRIPES]
+
+
+def versions(cur, namespaces: Iterable[str]) -> str:
+    '''Текущие версии пространств имён в виде суффикса ключа.'''
+    namespaces = sorted(namespaces)
+    now = time.monotonic()
+    stale = [ns for ns in namespaces if ns not in _versions or _versions[ns][0] <= now]
+    if stale:
+        cur.execute(
+            f"SELECT namespace, version FROM {SCHEMA}.cache_versions WHERE namespace = ANY(%s)",
+            (stale,)
+        )
+        found = {row['namespace']: row['version'] for row in cur.fetchall()}
+        for ns in stale:
+            _versions[ns] = (now + VERSION_TTL, found.get(ns, 0))
+    return ','.join(f'{ns}={_versions[ns][1]}' for ns in namespaces)
+
+
+def bump(cur, *namespaces: str) -> None:
+    '''Увеличивает версии в транзакции вызывающего. Commit делает вызывающий.'''
+    if not namespaces:
+        return
+    cur.execute(f"""
+        INSERT INTO {SCHEMA}.cache_versions AS v (namespace, version)
+        SELECT ns, 1 FROM unnest(%s::text[]) AS ns
+        ON CONFLICT (namespace) DO UPDATE SET version = v.version + 1
+    """, (sorted(set(namespaces)),))
+    for ns in namespaces:
+        _versions.pop(ns, None)
+
+
+def _local_get(key: str):
+    entry = _local.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _local[key]
+        return None
+    _local.move_to_end(key)
+    return entry[1]
+
+
+def _local_put(key: str, value: str, ttl: float) -> None:
+    _local[key] = (time.monotonic() + ttl, value)
+    _local.move_to_end(key)
+    while len(_local) > LOCAL_SIZE:
+        _local.popitem(last=False)
+
+
+def _shared_get(cur, key: str):
+    cur.execute(
+        f"SELECT value FROM {SCHEMA}.cache_entries WHERE key = %s AND expires_at > NOW()",
+        (key,)
+    )
+    row = cur.fetchone()
+    return row['value'] if row else None
+
+
+def _shared_put(cur, key: str, value: str, ttl: float) -> None:
+    cur.execute(f"""
+        INSERT INTO {SCHEMA}.cache_entries (key, value, expires_at)
+        VALUES (%s, %s, NOW() + %s * INTERVAL '1 second')
+        ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+    """, (key, value, ttl))
+    if random.random() < PRUNE_PROBABILITY:
+        cur.execute(f"DELETE FROM {SCHEMA}.cache_entries WHERE expires_at < NOW()")
+    cur.connection.commit()
+
+
+def get_or_compute(cur, namespaces: Iterable[str], key: str, ttl: float, compute: Callable[[], str]) -> str:
+    '''
+    Значение (обычно готовое тело ответа) по ключу key с учётом версий namespaces.
+    compute вызывается только при промахе обоих уровней и только одним исполнителем.
+    Общий уровень коммитит транзакцию cur — вызывать из обработчиков чтения.
+    '''
+    full_key = f'{key}|{versions(cur, namespaces)}'
+    value = _local_get(full_key)
+    if value is not None:
+        _stats['local_hits'] += 1
+        return value
+
+    with _lock_for(full_key):
+        value = _local_get(full_key)
+        if value is not None:
+            _stats['local_hits'] += 1
+            return value
+
+        value = _shared_get(cur, full_key) if SHARED else None
+        if value is None and not SHARED:
+            _stats['misses'] += 1
+            value = compute()
+        elif value is None:
+            cur.execute("SELECT pg_advisory_lock(hashtext(%s))", (full_key,))
+            try:
+                value = _shared_get(cur, full_key)
+                if value is None:
+                    _stats['misses'] += 1
+                    value = compute()
+                    _shared_put(cur, full_key, value, ttl)
+                else:
+                    _stats['shared_hits'] += 1
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (full_key,))
+        else:
+            _stats['shared_hits'] += 1
+        _local_put(full_key, value, ttl)
+    return value
+
+
+def stats() -> Dict[str, float]:
+    '''Счётчики попаданий процесса и доля попаданий.'''
+    total = sum(_stats.values())
+    hits = _stats['local_hits'] + _stats['shared_hits']
+    return {**_stats, 'hit_rate': round(hits / total, 4) if total else 0.0}
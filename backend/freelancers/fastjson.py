@@ -0,0 +1,33 @@
+"""Сериализация ответов за один проход.
+
+Если установлен orjson, он кодирует строки, числа, datetime и списки сам; иначе —
+стандартный json. В обоих случаях остальные типы проходят через один обработчик:
+datetime/date/time — ISO 8601, Decimal — строка (как раньше давал default=str).
+Для больших списков JSON можно собрать в Postgres через agg_sql(): Python
+тогда только передаёт готовый текст.
+"""
+import json
+from datetime import date, datetime, time
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=_default, ensure_ascii=False)
+
+
+def agg_sql(query: str, order_by: str) -> str:
+    '''Оборачивает запрос так, что он возвращает одну строку data с JSON-массивом строк в порядке order_by.'''
+    return f"SELECT COALESCE(json_agg(t ORDER BY {order_by}), '[]')::text AS data FROM ({query}) t"
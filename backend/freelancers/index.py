@@ -1,8 +1,118 @@
+import base64
 import json
 import os
+import re
+from datetime import datetime
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+import cache
+import conditional
+import fastjson
+import matching
+import session
+
+HISTORY_PAGE_SIZE = 10
+MAX_HISTORY_PAGE_SIZE = 50
+LIST_CACHE_TTL = 60
+LIST_CACHE_CONTROL = 'public, max-age=60, must-revalidate'
+PROFILE_CACHE_CONTROL = 'public, max-age=30, must-revalidate'
+RECOMMENDED_LIMIT = 20
+MAX_RECOMMENDED_LIMIT = 50
+
+FREELANCERS_SQL = """
+    SELECT id, skills, bio, hourly_rate, rating, total_reviews
+    FROM t_p96553691_freelance_platform_c.freelancers
+"""
+
+FREELANCERS_INDEX = matching.RefreshingIndex(
+    full_sql=FREELANCERS_SQL,
+    delta_sql=FREELANCERS_SQL + " WHERE updated_at > %s",
+    to_doc=lambda row: (
+        row['id'],
+        matching.build_terms(skills=row['skills'], text=row['bio']),
+        float(row['hourly_rate'] or 0),
+        0.0,
+        matching.rating_prior(row['rating'], row['total_reviews']),
+        True
+    )
+)
+
+CURSOR_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,6})?([+-]\d{2}(:?\d{2})?)?$')
+
+def encode_cursor(completed_at: str, completed_order_id: int) -> str:
+    return base64.urlsafe_b64encode(f'{completed_at}|{completed_order_id}'.encode()).decode()
+
+def decode_cursor(cursor):
+    '''Позиция из курсора; ValueError - если курсор повреждён.'''
+    if not cursor:
+        return None, None
+    completed_at, completed_order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    if not CURSOR_TIMESTAMP.match(completed_at):
+        raise ValueError('bad cursor')
+    datetime.strptime(completed_at[:19].replace(' ', 'T'), '%Y-%m-%dT%H:%M:%S')
+    return completed_at, int(completed_order_id)
+
+def fetch_history(cur, user_id: int, role: str, limit: int, cursor_at, cursor_id):
+    '''Страница истории из completed_orders по индексу (executor_id|client_id, completed_at) с оценкой второй стороны.'''
+    participant = 'executor_id' if role == 'executor' else 'client_id'
+    reviewer = 'client_id' if role == 'executor' else 'executor_id'
+    cur.execute(f"""
+        SELECT
+            co.id, co.order_id, co.title, co.category, co.budget_min, co.budget_max,
+            co.client_id, co.client_name, co.executor_id, co.executor_name, co.completed_at,
+            r.rating, r.comment as review_comment
+        FROM t_p96553691_freelance_platform_c.completed_orders co
+        LEFT JOIN t_p96553691_freelance_platform_c.order_reviews r
+            ON r.completed_order_id = co.id AND r.reviewer_id = co.{reviewer}
+        WHERE co.{participant} = %(user_id)s
+          AND (%(cursor_at)s::timestamp IS NULL
+               OR (co.completed_at, co.id) < (%(cursor_at)s::timestamp, %(cursor_id)s))
+        ORDER BY co.completed_at DESC, co.id DESC
+        LIMIT %(limit)s
+    """, {'user_id': user_id, 'cursor_at': cursor_at, 'cursor_id': cursor_id, 'limit': limit + 1})
+    rows = [dict(r) for r in cur.fetchall()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['completed_at'].isoformat(), rows[-1]['id'])
+    return rows, next_cursor
+
+def recommended_freelancers(cur, order_id: int, limit: int):
+    '''Фрилансеры, подходящие заказу по навыкам, ставке и рейтингу, в порядке убывания оценки.'''
+    cur.execute("""
+        SELECT title, description, category, budget_max, user_id
+        FROM t_p96553691_freelance_platform_c.orders
+        WHERE id = %s AND deleted_at IS NULL
+    """, (order_id,))
+    order = cur.fetchone()
+    if not order:
+        return None
+    
+    index = FREELANCERS_INDEX.ensure_fresh(cur)
+    query = matching.build_terms(category=order['category'], text=f"{order['title']} {order['description'] or ''}")
+    ranked = index.search(query, k=limit + 1, budget_max=float(order['budget_max'] or 0))
+    if not ranked:
+        return []
+    
+    cur.execute("""
+        SELECT
+            f.id, f.user_id, u.name, u.username,
+            f.bio, f.hourly_rate, f.avatar_url, f.skills,
+            f.rating, f.total_reviews, f.completed_projects
+        FROM t_p96553691_freelance_platform_c.freelancers f
+        JOIN t_p96553691_freelance_platform_c.users u ON f.user_id = u.id
+        WHERE f.id = ANY(%s) AND f.user_id <> %s
+    """, ([freelancer_id for freelancer_id, _ in ranked], order['user_id']))
+    rows = {row['id']: dict(row) for row in cur.fetchall()}
+    
+    freelancers = []
+    for freelancer_id, score in ranked:
+        if freelancer_id in rows:
+            rows[freelancer_id]['match_score'] = round(score, 4)
+            freelancers.append(rows[freelancer_id])
+    return freelancers[:limit]
+
 def handler(event: dict, context) -> dict:
     '''API для работы с фрилансерами - получение списка, профиля, отзывов'''
     
@@ -14,7 +124,7 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id'
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token, If-None-Match'
             },
             'body': ''
         }
@@ -38,43 +148,55 @@ def handler(event: dict, context) -> dict:
         if limit > 100:
             limit = 100
         
-        cur.execute(f"""
-            SELECT
-                f.id,
-                f.user_id,
-                u.name,
-                u.username,
-                f.bio,
-                f.hourly_rate,
-                f.avatar_url,
-                f.skills,
-                f.rating,
-                f.total_reviews,
-                f.completed_projects,
-                f.created_at,
-                COALESCE(r.review_count, 0) as review_count,
-                COALESCE(r.avg_rating, 0) as real_avg_rating
-            FROM t_p96553691_freelance_platform_c.freelancers f
-            JOIN t_p96553691_freelance_platform_c.users u ON f.user_id = u.id
-            INNER JOIN (
-                SELECT reviewee_id, COUNT(*) as review_count, ROUND(AVG(rating)::numeric, 2) as avg_rating
-                FROM t_p96553691_freelance_platform_c.order_reviews
-                WHERE role = 'client'
-                GROUP BY reviewee_id
-                HAVING COUNT(*) >= 1
-            ) r ON r.reviewee_id = f.user_id
-            ORDER BY r.avg_rating DESC, f.completed_projects DESC
-            LIMIT {limit}
-        """)
+        etag = conditional.make_etag(cache.versions(cur, ['freelancers']), 'list', limit)
+        if conditional.matches(event.get('headers'), etag):
+            cur.close()
+            conn.close()
+            return conditional.not_modified(etag, LIST_CACHE_CONTROL)
+        
+        def load_list() -> str:
+            cur.execute(f"""
+                SELECT
+                    f.id,
+                    f.user_id,
+                    u.name,
+                    u.username,
+                    f.bio,
+                    f.hourly_rate,
+                    f.avatar_url,
+                    f.skills,
+                    f.rating,
+                    f.total_reviews,
+                    f.completed_projects,
+                    f.created_at,
+                    COALESCE(r.review_count, 0) as review_count,
+                    COALESCE(r.avg_rating, 0) as real_avg_rating
+                FROM t_p96553691_freelance_platform_c.freelancers f
+                JOIN t_p96553691_freelance_platform_c.users u ON f.user_id = u.id
+                INNER JOIN (
+                    SELECT reviewee_id, COUNT(*) as review_count, ROUND(AVG(rating)::numeric, 2) as avg_rating
+                    FROM t_p96553691_freelance_platform_c.order_reviews
+                    WHERE role = 'client'
+                    GROUP BY reviewee_id
+                    HAVING COUNT(*) >= 1
+                ) r ON r.reviewee_id = f.user_id
+                ORDER BY r.avg_rating DESC, f.completed_projects DESC
+                LIMIT {limit}
+            """)
+            return fastjson.dumps({'freelancers': cur.fetchall()})
         
-        freelancers = [dict(r) for r in cur.fetchall()]
+        body = cache.get_or_compute(cur, ['freelancers'], f'freelancers:list:{limit}', LIST_CACHE_TTL, load_list)
         cur.close()
         conn.close()
         
         return {
             'statusCode': 200,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'freelancers': freelancers}, default=str)
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                **conditional.cache_headers(etag, LIST_CACHE_CONTROL)
+            },
+            'body': body
         }
     
     if method == 'GET' and action == 'profile':
@@ -88,6 +210,13 @@ def handler(event: dict, context) -> dict:
                 'body': json.dumps({'error': 'freelancer_id required'})
             }
         
+        # Профиль, отзывы и история меняются только вместе с версией 'freelancers'
+        etag = conditional.make_etag(cache.versions(cur, ['freelancers']), 'profile', freelancer_id)
+        if conditional.matches(event.get('headers'), etag):
+            cur.close()
+            conn.close()
+            return conditional.not_modified(etag, PROFILE_CACHE_CONTROL)
+        
         cur.execute(f"""
             SELECT 
                 f.id, f.user_id, u.name, u.username, u.email,
@@ -120,34 +249,115 @@ def handler(event: dict, context) -> dict:
         """)
         reviews = [dict(r) for r in cur.fetchall()]
         
-        cur.execute(f"""
-            SELECT o.id, o.title, o.description, o.category,
-                   o.budget_min, o.budget_max, o.status, o.created_at
-            FROM t_p96553691_freelance_platform_c.orders o
-            WHERE o.executor_id = (
-                SELECT user_id FROM t_p96553691_freelance_platform_c.freelancers WHERE id = {freelancer_id}
-            ) AND o.status = 'completed'
-            ORDER BY o.created_at DESC
-            LIMIT 10
-        """)
-        completed_orders = [dict(r) for r in cur.fetchall()]
+        completed_orders, history_cursor = fetch_history(cur, freelancer['user_id'], 'executor', HISTORY_PAGE_SIZE, None, None)
+        
+        cur.execute("""
+            SELECT rating_sum, rating_count, stars_1, stars_2, stars_3, stars_4, stars_5
+            FROM t_p96553691_freelance_platform_c.review_stats
+            WHERE reviewee_id = %s AND role = 'client'
+        """, (freelancer['user_id'],))
+        stats = cur.fetchone()
+        rating_summary = {
+            'avg_rating': round(stats['rating_sum'] / stats['rating_count'], 2) if stats and stats['rating_count'] else None,
+            'total': stats['rating_count'] if stats else 0,
+            'histogram': {str(star): stats[f'stars_{star}'] if stats else 0 for star in range(1, 6)}
+        }
         
         cur.close()
         conn.close()
         
         return {
             'statusCode': 200,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                **conditional.cache_headers(etag, PROFILE_CACHE_CONTROL)
+            },
             'body': json.dumps({
                 'freelancer': dict(freelancer),
                 'reviews': reviews,
-                'completed_orders': completed_orders
+                'completed_orders': completed_orders,
+                'completed_orders_next_cursor': history_cursor,
+                'rating_summary': rating_summary
             }, default=str)
         }
     
+    if method == 'GET' and action == 'history':
+        user_id = int(query_params.get('user_id', 0))
+        role = query_params.get('role', 'executor')
+        if not user_id or role not in ('executor', 'client'):
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'user_id and role (executor or client) required'})
+            }
+        
+        try:
+            limit = max(1, min(int(query_params.get('limit', HISTORY_PAGE_SIZE)), MAX_HISTORY_PAGE_SIZE))
+            cursor_at, cursor_id = decode_cursor(query_params.get('cursor'))
+        except ValueError:
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Invalid limit or cursor'})
+            }
+        history, next_cursor = fetch_history(cur, user_id, role, limit, cursor_at, cursor_id)
+        
+        cur.close()
+        conn.close()
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'history': history, 'next_cursor': next_cursor}, default=str)
+        }
+    
+    if method == 'GET' and action == 'recommended':
+        order_id = query_params.get('order_id')
+        if not order_id:
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'order_id required'})
+            }
+        
+        try:
+            order_id = int(order_id)
+            limit = max(1, min(int(query_params.get('limit', RECOMMENDED_LIMIT)), MAX_RECOMMENDED_LIMIT))
+        except ValueError:
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'order_id and limit must be integers'})
+            }
+        freelancers = recommended_freelancers(cur, order_id, limit)
+        cur.close()
+        conn.close()
+        
+        if freelancers is None:
+            return {
+                'statusCode': 404,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Order not found'})
+            }
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'freelancers': freelancers}, default=str)
+        }
+    
     if method == 'POST':
-        user_id_header = event.get('headers', {}).get('X-User-Id')
-        if not user_id_header:
+        user_id = session.authenticate(cur, event.get('headers'))
+        if not user_id:
             cur.close()
             conn.close()
             return {
@@ -157,7 +367,6 @@ def handler(event: dict, context) -> dict:
             }
         
         data = json.loads(event.get('body', '{}'))
-        user_id = int(user_id_header)
         bio = data.get('bio', '').replace("'", "''")
         hourly_rate = int(data.get('hourly_rate', 0))
         avatar_url = data.get('avatar_url', '').replace("'", "''")
@@ -173,10 +382,12 @@ def handler(event: dict, context) -> dict:
                 bio = EXCLUDED.bio,
                 hourly_rate = EXCLUDED.hourly_rate,
                 avatar_url = EXCLUDED.avatar_url,
-                skills = EXCLUDED.skills
+                skills = EXCLUDED.skills,
+                updated_at = NOW()
             RETURNING id
         """)
         result = cur.fetchone()
+        cache.bump(cur, 'freelancers')
         conn.commit()
         cur.close()
         conn.close()
@@ -0,0 +1,251 @@
+"""Подбор заказов и фрилансеров по навыкам: разреженные векторы термов и пакетный скоринг на NumPy.
+
+Документ (фрилансер или заказ) — словарь терм -> вес: слова навыков, категории и текста
+с сублинейным tf. Индекс держит инвертированные списки по термам; запрос считает
+косинусную близость для всех кандидатов сразу (np.bincount по спискам) и смешивает её
+с соответствием бюджета ставке и априорным рейтингом. Индекс живёт в памяти процесса
+и обновляется инкрементально по updated_at (удалённые из таблицы строки — отдельным
+запросом removed_sql), полная перестройка — раз в REBUILD_INTERVAL.
+"""
+import math
+import re
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r'[\w+#]+', re.UNICODE)
+MIN_TOKEN_LEN = 2
+SKILL_WEIGHT = 3.0
+CATEGORY_WEIGHT = 2.0
+TEXT_WEIGHT = 1.0
+
+SIMILARITY_WEIGHT = 0.7
+BUDGET_WEIGHT = 0.15
+PRIOR_WEIGHT = 0.15
+
+PRIOR_REVIEWS = 5
+PRIOR_RATING = 3.5
+
+REFRESH_INTERVAL = 30
+REBUILD_INTERVAL = 600
+# Запас на транзакции, начатые до прошлой догрузки и зафиксированные после неё
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def tokens(text: Optional[str]) -> List[str]:
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if len(t) >= MIN_TOKEN_LEN]
+
+
+def build_terms(skills: Optional[List[str]] = None, category: Optional[str] = None,
+                text: Optional[str] = None) -> Dict[str, float]:
+    '''Вектор документа: навыки и категория весят больше свободного текста.'''
+    counts: Counter = Counter()
+    for skill in skills or []:
+        for token in tokens(skill):
+            counts[token] += SKILL_WEIGHT
+    for token in tokens(category):
+        counts[token] += CATEGORY_WEIGHT
+    for token in tokens(text):
+        counts[token] += TEXT_WEIGHT
+    return {term: 1.0 + math.log(weight) if weight >= 1 else weight for term, weight in counts.items()}
+
+
+def rating_prior(rating: Optional[float], reviews: Optional[int]) -> float:
+    '''Байесовское среднее рейтинга, нормированное в [0, 1].'''
+    reviews = reviews or 0
+    rating = float(rating or 0)
+    return (rating * reviews + PRIOR_RATING * PRIOR_REVIEWS) / (reviews + PRIOR_REVIEWS) / 5.0
+
+
+def budget_fit(rates, budget_max):
+    '''1, если ставка укладывается в бюджет (или данных нет), иначе доля бюджета от ставки.'''
+    rates = np.asarray(rates, dtype=np.float32)
+    budget_max = np.asarray(budget_max, dtype=np.float32)
+    known = (rates > 0) & (budget_max > 0)
+    ratio = np.divide(budget_max, rates, out=np.ones(np.broadcast(rates, budget_max).shape, dtype=np.float32),
+                      where=known)
+    return np.clip(ratio, 0.0, 1.0)
+
+
+class MatchIndex:
+    '''Инвертированный индекс со слотами: обновление документа гасит старый слот и добавляет новый.'''
+
+    def __init__(self):
+        self._slot_of: Dict[int, int] = {}
+        self._docs: Dict[int, Tuple[Dict[str, float], float, float, float]] = {}
+        self._slot_ids: List[int] = []
+        self._alive: List[bool] = []
+        self._norms: List[float] = []
+        self._rates: List[float] = []
+        self._budgets: List[float] = []
+        self._priors: List[float] = []
+        self._postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        self._df: Counter = Counter()
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+        self._term_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def upsert(self, item_id: int, terms: Dict[str, float], rate: float = 0.0,
+               budget_max: float = 0.0, prior: float = 1.0) -> None:
+        self.remove(item_id)
+        if not terms:
+            return
+        slot = len(self._slot_ids)
+        self._slot_of[item_id] = slot
+        self._docs[item_id] = (terms, rate, budget_max, prior)
+        self._slot_ids.append(item_id)
+        self._alive.append(True)
+        self._norms.append(math.sqrt(sum(w * w for w in terms.values())))
+        self._rates.append(float(rate or 0))
+        self._budgets.append(float(budget_max or 0))
+        self._priors.append(float(prior))
+        for term, weight in terms.items():
+            slots, weights = self._postings.setdefault(term, ([], []))
+            slots.append(slot)
+            weights.append(weight)
+            self._df[term] += 1
+            self._term_arrays.pop(term, None)
+        self._arrays = None
+        if len(self._slot_ids) > 2 * len(self._slot_of) + 1024:
+            self._compact()
+
+    def remove(self, item_id: int) -> None:
+        slot = self._slot_of.pop(item_id, None)
+        if slot is None:
+            return
+        terms = self._docs.pop(item_id)[0]
+        self._alive[slot] = False
+        for term in terms:
+            self._df[term] -= 1
+        self._arrays = None
+
+    def _compact(self) -> None:
+        docs = self._docs
+        self.__init__()
+        for item_id, (terms, rate, budget_max, prior) in docs.items():
+            self.upsert(item_id, terms, rate, budget_max, prior)
+
+    def _freeze(self) -> Dict[str, np.ndarray]:
+        if self._arrays is None:
+            self._arrays = {
+                'ids': np.asarray(self._slot_ids, dtype=np.int64),
+                'alive': np.asarray(self._alive, dtype=bool),
+                'norms': np.asarray(self._norms, dtype=np.float32),
+                'rates': np.asarray(self._rates, dtype=np.float32),
+                'budgets': np.asarray(self._budgets, dtype=np.float32),
+                'priors': np.asarray(self._priors, dtype=np.float32),
+            }
+        return self._arrays
+
+    def _posting(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if term not in self._postings:
+            return None
+        cached = self._term_arrays.get(term)
+        if cached is None:
+            slots, weights = self._postings[term]
+            cached = (np.asarray(slots, dtype=np.int64), np.asarray(weights, dtype=np.float32))
+            self._term_arrays[term] = cached
+        return cached
+
+    def search(self, query: Dict[str, float], k: int = 50, rate: Optional[float] = None,
+               budget_max: Optional[float] = None) -> List[Tuple[int, float]]:
+        '''
+        Топ-k документов для запроса. Для запроса-заказа передаётся budget_max
+        (сравнивается со ставками документов), для запроса-фрилансера — rate
+        (сравнивается с бюджетами документов).
+        '''
+        arrays = self._freeze()
+        size = len(arrays['ids'])
+        if not query or not size:
+            return []
+
+        alive_docs = max(len(self._slot_of), 1)
+        scores = np.zeros(size, dtype=np.float32)
+        query_norm = 0.0
+        for term, weight in query.items():
+            posting = self._posting(term)
+            if posting is None or self._df[term] <= 0:
+                continue
+            idf = math.log((alive_docs + 1) / (self._df[term] + 1)) + 1.0
+            slots, weights = posting
+            scores += np.bincount(slots, weights=weights * (weight * idf), minlength=size).astype(np.float32)
+            query_norm += (weight * idf) ** 2
+        if query_norm == 0:
+            return []
+
+        candidates = np.nonzero((scores > 0) & arrays['alive'])[0]
+        if not len(candidates):
+            return []
+
+        similarity = scores[candidates] / (arrays['norms'][candidates] * math.sqrt(query_norm))
+        if budget_max is not None:
+            fit = budget_fit(arrays['rates'][candidates], budget_max)
+        elif rate is not None:
+            fit = budget_fit(rate, arrays['budgets'][candidates])
+        else:
+            fit = np.ones(len(candidates), dtype=np.float32)
+        final = (SIMILARITY_WEIGHT * similarity + BUDGET_WEIGHT * fit
+                 + PRIOR_WEIGHT * arrays['priors'][candidates])
+
+        if len(candidates) > k:
+            top = np.argpartition(-final, k)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-final[top])]
+        return [(int(arrays['ids'][candidates[i]]), float(final[i])) for i in top]
+
+
+class RefreshingIndex:
+    '''
+    Индекс с периодическим обновлением из БД.
+    full_sql выбирает все документы, delta_sql — изменённые после %s (updated_at),
+    removed_sql — id строк, удалённых из таблицы после %s.
+    to_doc(row) -> (item_id, terms, rate, budget_max, prior, active).
+    '''
+
+    def __init__(self, full_sql: str, delta_sql: str, to_doc: Callable[[Dict[str, Any]], tuple],
+                 removed_sql: Optional[str] = None):
+        self.full_sql = full_sql
+        self.delta_sql = delta_sql
+        self.removed_sql = removed_sql
+        self.to_doc = to_doc
+        self.index = MatchIndex()
+        self.watermark = None
+        self.built_at = 0.0
+        self.checked_at = 0.0
+
+    def _apply(self, rows) -> None:
+        for row in rows:
+            item_id, terms, rate, budget_max, prior, active = self.to_doc(row)
+            if active:
+                self.index.upsert(item_id, terms, rate, budget_max, prior)
+            else:
+                self.index.remove(item_id)
+
+    def ensure_fresh(self, cur) -> MatchIndex:
+        now = time.monotonic()
+        if not self.built_at or now - self.built_at > REBUILD_INTERVAL:
+            cur.execute("SELECT NOW() AS now")
+            watermark = cur.fetchone()['now']
+            cur.execute(self.full_sql)
+            self.index = MatchIndex()
+            self._apply(cur.fetchall())
+            self.watermark = watermark - REFRESH_OVERLAP
+            self.built_at = self.checked_at = now
+        elif now - self.checked_at > REFRESH_INTERVAL:
+            cur.execute("SELECT NOW() AS now")
+            watermark = cur.fetchone()['now']
+            cur.execute(self.delta_sql, (self.watermark,))
+            self._apply(cur.fetchall())
+            if self.removed_sql:
+                cur.execute(self.removed_sql, (self.watermark,))
+                for row in cur.fetchall():
+                    self.index.remove(row['id'])
+            self.watermark = watermark - REFRESH_OVERLAP
+            self.checked_at = now
+        return self.index
@@ -1,13 +1,262 @@
 import json
 import os
+from datetime import date
 from typing import Dict, Any
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+import cache
+import conditional
+import fastjson
+import matching
+import responses
+
+FEED_CACHE_TTL = 30
+FEED_CACHE_CONTROL = 'public, max-age=10, must-revalidate'
+RECOMMENDED_LIMIT = 20
+MAX_RECOMMENDED_LIMIT = 50
+INBOX_LIMIT = 50
+EXCERPT_LENGTH = 200
+
+# Поля списков заказов: имя в ответе -> выражение SQL. В fields и view=card description -
+# отрывок из EXCERPT_LENGTH символов; полный текст отдают view=full (по умолчанию) и action=get
+ORDER_FIELDS = {
+    'id': 'o.id',
+    'user_id': 'o.user_id',
+    'title': 'o.title',
+    'description': f'left(o.description, {EXCERPT_LENGTH})',
+    'description_truncated': f'length(o.description) > {EXCERPT_LENGTH}',
+    'category': 'o.category',
+    'budget_min': 'o.budget_min',
+    'budget_max': 'o.budget_max',
+    'deadline': 'o.deadline',
+    'status': 'o.status',
+    'response_count': 'o.response_count',
+    'executor_id': 'o.executor_id',
+    'created_at': 'o.created_at',
+    'updated_at': 'o.updated_at',
+    'user_name': 'u.name',
+    'username': 'u.username',
+    'executor_name': 'executor.name',
+    'executor_username': 'executor.username'
+}
+# Порядок интервалов фасетов; метки совпадают с order_budget_bucket/order_deadline_bucket в БД
+BUDGET_BUCKETS = ('0-5000', '5000-20000', '20000-50000', '50000-100000', '100000+', 'none')
+DEADLINE_BUCKETS = ('overdue', 'week', 'month', 'later', 'none')
+
+CARD_FIELDS = (
+    'id', 'user_id', 'title', 'description', 'description_truncated', 'category',
+    'budget_min', 'budget_max', 'deadline', 'status', 'response_count', 'created_at', 'user_name'
+)
+
+ORDERS_INDEX = matching.RefreshingIndex(
+    full_sql="""
+        SELECT id, title, description, category, budget_max, status, deleted_at
+        FROM t_p96553691_freelance_platform_c.orders
+        WHERE status = 'active' AND deleted_at IS NULL
+    """,
+    delta_sql="""
+        SELECT id, title, description, category, budget_max, status, deleted_at
+        FROM t_p96553691_freelance_platform_c.orders
+        WHERE updated_at > %s
+    """,
+    # Завершённый заказ удаляется из orders (переносится в completed_orders),
+    # поэтому в delta_sql его уже нет — id берутся из журнала событий
+    removed_sql="""
+        SELECT DISTINCT order_id AS id
+        FROM t_p96553691_freelance_platform_c.order_events
+        WHERE event_type IN ('order.completed', 'order.deleted')
+          AND order_id IS NOT NULL AND created_at > %s
+    """,
+    to_doc=lambda row: (
+        row['id'],
+        matching.build_terms(category=row['category'], text=f"{row['title']} {row['description'] or ''}"),
+        0.0,
+        float(row['budget_max'] or 0),
+        1.0,
+        row['status'] == 'active' and row['deleted_at'] is None
+    )
+)
+
+def order_projection(fields):
+    '''
+    Список SELECT и JOIN для полей fields; None - полная строка заказа (view=full).
+    id и created_at выбираются всегда: по ним сортируется лента.
+    '''
+    if fields is None:
+        return ('o.*, u.name as user_name, u.username, '
+                'executor.name as executor_name, executor.username as executor_username',
+                'JOIN t_p96553691_freelance_platform_c.users u ON o.user_id = u.id '
+                'LEFT JOIN t_p96553691_freelance_platform_c.users executor ON o.executor_id = executor.id')
+    names = ['id', 'created_at'] + [name for name in fields if name not in ('id', 'created_at')]
+    columns = ', '.join(f'{ORDER_FIELDS[name]} as {name}' for name in names)
+    joins = ''
+    if any(ORDER_FIELDS[name].startswith('u.') for name in names):
+        joins += 'JOIN t_p96553691_freelance_platform_c.users u ON o.user_id = u.id '
+    if any(ORDER_FIELDS[name].startswith('executor.') for name in names):
+        joins += 'LEFT JOIN t_p96553691_freelance_platform_c.users executor ON o.executor_id = executor.id'
+    return columns, joins
+
+def parse_filters(query_params: Dict[str, str]) -> Dict[str, Any]:
+    '''Фильтры ленты из параметров запроса. ValueError - если user_id или бюджет не число или дата не YYYY-MM-DD.'''
+    min_budget = query_params.get('min_budget')
+    max_budget = query_params.get('max_budget')
+    deadline_before = query_params.get('deadline_before')
+    deadline_after = query_params.get('deadline_after')
+    return {
+        'user_id': int(query_params['user_id']) if query_params.get('user_id') else None,
+        'category': query_params.get('category') or None,
+        'status': query_params.get('status', 'active'),
+        'min_budget': int(min_budget) if min_budget else None,
+        'max_budget': int(max_budget) if max_budget else None,
+        'deadline_before': date.fromisoformat(deadline_before) if deadline_before else None,
+        'deadline_after': date.fromisoformat(deadline_after) if deadline_after else None
+    }
+
+def filters_key(filters: Dict[str, Any]) -> str:
+    '''Непустые фильтры в виде строки для ключа кэша и ETag.'''
+    return ':'.join(f'{name}={value}' for name, value in filters.items() if value not in (None, ''))
+
+def feed_filters(filters: Dict[str, Any]):
+    '''
+    Условия ленты после "WHERE o.deleted_at IS NULL" и параметры к ним.
+    Бюджет заказа - диапазон budget_min..budget_max: min_budget отбирает заказы с
+    budget_max не ниже, max_budget - с budget_min не выше. Границы срока включаются.
+    '''
+    sql = ''
+    params = []
+    
+    if filters['user_id']:
+        sql += " AND o.user_id = %s"
+        params.append(filters['user_id'])
+    
+    if filters['category']:
+        sql += " AND o.category = %s"
+        params.append(filters['category'])
+    
+    if filters['status']:
+        sql += " AND o.status = %s"
+        params.append(filters['status'])
+    
+    if filters['min_budget'] is not None:
+        sql += " AND o.budget_max >= %s"
+        params.append(filters['min_budget'])
+    
+    if filters['max_budget'] is not None:
+        sql += " AND o.budget_min <= %s"
+        params.append(filters['max_budget'])
+    
+    if filters['deadline_after']:
+        sql += " AND o.deadline >= %s"
+        params.append(filters['deadline_after'])
+    
+    if filters['deadline_before']:
+        sql += " AND o.deadline <= %s"
+        params.append(filters['deadline_before'])
+    
+    return sql, params
+
+def order_facets(cur, filters: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Число заказов по категориям, диапазонам бюджета и срокам для текущих фильтров.
+    Лента активных заказов без фильтров читается из счётчиков order_facet_counts,
+    остальные наборы фильтров считаются одним запросом с GROUPING SETS.
+    '''
+    if filters_key(filters) == 'status=active':
+        cur.execute("""
+            SELECT facet,
+                   CASE WHEN facet = 'deadline'
+                        THEN t_p96553691_freelance_platform_c.order_deadline_bucket(NULLIF(value, '')::date)
+                        ELSE value END AS value,
+                   SUM(count)::bigint AS count
+            FROM t_p96553691_freelance_platform_c.order_facet_counts
+            WHERE count > 0
+            GROUP BY 1, 2
+        """)
+    else:
+        conditions, params = feed_filters(filters)
+        cur.execute(f"""
+            SELECT CASE WHEN GROUPING(category) = 0 THEN 'category'
+                        WHEN GROUPING(budget) = 0 THEN 'budget'
+                        WHEN GROUPING(deadline) = 0 THEN 'deadline' END AS facet,
+                   COALESCE(category, budget, deadline) AS value,
+                   COUNT(*) AS count
+            FROM (
+                SELECT o.category,
+                       t_p96553691_freelance_platform_c.order_budget_bucket(o.budget_min, o.budget_max) AS budget,
+                       t_p96553691_freelance_platform_c.order_deadline_bucket(o.deadline) AS deadline
+                FROM t_p96553691_freelance_platform_c.orders o
+                WHERE o.deleted_at IS NULL{conditions}
+            ) f
+            GROUP BY GROUPING SETS ((category), (budget), (deadline), ())
+        """, params)
+    
+    counts = {'category': {}, 'budget': {}, 'deadline': {}}
+    total = None
+    for row in cur.fetchall():
+        if row['facet'] is None:
+            total = row['count']
+        else:
+            counts[row['facet']][row['value']] = row['count']
+    
+    return {
+        'total': total if total is not None else sum(counts['category'].values()),
+        'categories': [
+            {'value': value, 'count': count}
+            for value, count in sorted(counts['category'].items(), key=lambda item: (-item[1], item[0]))
+        ],
+        'budget': [{'value': value, 'count': counts['budget'].get(value, 0)} for value in BUDGET_BUCKETS],
+        'deadline': [{'value': value, 'count': counts['deadline'].get(value, 0)} for value in DEADLINE_BUCKETS]
+    }
+
+def recommended_orders(cur, freelancer_user_id: int, limit: int):
+    '''Заказы, подходящие фрилансеру по навыкам, ставке и тексту профиля, в порядке убывания оценки.'''
+    cur.execute("""
+        SELECT skills, bio, hourly_rate
+        FROM t_p96553691_freelance_platform_c.freelancers
+        WHERE user_id = %s
+    """, (freelancer_user_id,))
+    profile = cur.fetchone()
+    if not profile:
+        return None
+    
+    index = ORDERS_INDEX.ensure_fresh(cur)
+    query = matching.build_terms(skills=profile['skills'], text=profile['bio'])
+    # Запас на заказы, закрытые после последнего обновления индекса
+    ranked = index.search(query, k=limit * 2, rate=float(profile['hourly_rate'] or 0))
+    if not ranked:
+        return []
+    
+    cur.execute("""
+        SELECT o.*, 
+               u.name as user_name, 
+               u.username
+        FROM t_p96553691_freelance_platform_c.orders o 
+        JOIN t_p96553691_freelance_platform_c.users u ON o.user_id = u.id 
+        WHERE o.id = ANY(%(ids)s)
+          AND o.status = 'active' AND o.deleted_at IS NULL
+          AND o.user_id <> %(user_id)s
+          AND NOT EXISTS (
+              SELECT 1 FROM t_p96553691_freelance_platform_c.order_responses r
+              WHERE r.order_id = o.id AND r.freelancer_id = %(user_id)s
+          )
+    """, {'ids': [order_id for order_id, _ in ranked], 'user_id': freelancer_user_id})
+    rows = {row['id']: dict(row) for row in cur.fetchall()}
+    
+    orders = []
+    for order_id, score in ranked:
+        if order_id in rows:
+            rows[order_id]['match_score'] = round(score, 4)
+            orders.append(rows[order_id])
+    return orders[:limit]
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Get all orders or user's orders from database
-    Args: event with httpMethod, queryStringParameters with user_id (optional)
+    Args: event with httpMethod, queryStringParameters with user_id, category, status,
+          min_budget, max_budget, deadline_before, deadline_after, fields, view (optional);
+          action=get&id= returns one order with full description;
+          action=facets returns counts by category, budget and deadline for the filters
           context with request_id
     Returns: HTTP response with list of orders
     '''
@@ -19,7 +268,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token, If-None-Match',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
@@ -40,75 +289,273 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     query_params = event.get('queryStringParameters') or {}
     user_id = query_params.get('user_id')
     freelancer_id = query_params.get('freelancer_id')
-    category = query_params.get('category')
-    status = query_params.get('status', 'active')
+    action = query_params.get('action')
+    view = query_params.get('view')
+    
+    try:
+        filters = parse_filters(query_params)
+    except ValueError:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': 'Invalid filter value'}),
+            'isBase64Encoded': False
+        }
+    
+    # По умолчанию - полные строки: карточки интерфейса показывают описание целиком
+    # и не запрашивают action=get; компактные карточки - по view=card
+    if query_params.get('fields'):
+        fields = [name.strip() for name in query_params['fields'].split(',') if name.strip()]
+        unknown = [name for name in fields if name not in ORDER_FIELDS]
+        if unknown:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': f"Unknown fields: {', '.join(unknown)}"}),
+                'isBase64Encoded': False
+            }
+    elif view not in (None, 'card', 'full'):
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': 'view must be card or full'}),
+            'isBase64Encoded': False
+        }
+    elif view in (None, 'full'):
+        fields = None
+    else:
+        fields = list(CARD_FIELDS)
     
     database_url = os.environ.get('DATABASE_URL')
     
     conn = psycopg2.connect(database_url)
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    if freelancer_id:
-        query = """
+    if action == 'get':
+        order_id = query_params.get('id')
+        if not order_id:
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'id required'}),
+                'isBase64Encoded': False
+            }
+        try:
+            order_id = int(order_id)
+        except ValueError:
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'id must be an integer'}),
+                'isBase64Encoded': False
+            }
+        
+        etag = conditional.make_etag(cache.versions(cur, ['orders']), 'order', order_id)
+        if conditional.matches(event.get('headers'), etag):
+            cur.close()
+            conn.close()
+            return conditional.not_modified(etag, FEED_CACHE_CONTROL)
+        
+        columns, joins = order_projection(None)
+        cur.execute(f"""
+            SELECT {columns}
+            FROM t_p96553691_freelance_platform_c.orders o
+            {joins}
+            WHERE o.id = %s AND o.deleted_at IS NULL
+        """, (order_id,))
+        order = cur.fetchone()
+        cur.close()
+        conn.close()
+        
+        if not order:
+            return {
+                'statusCode': 404,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'Order not found'}),
+                'isBase64Encoded': False
+            }
+        
+        return responses.build(
+            200, fastjson.dumps({'order': order}), event.get('headers'),
+            conditional.cache_headers(etag, FEED_CACHE_CONTROL)
+        )
+    
+    if action == 'facets':
+        etag = conditional.make_etag(cache.versions(cur, ['orders']), 'facets', filters_key(filters))
+        if conditional.matches(event.get('headers'), etag):
+            cur.close()
+            conn.close()
+            return conditional.not_modified(etag, FEED_CACHE_CONTROL)
+        
+        body = cache.get_or_compute(
+            cur, ['orders'], f'facets:{filters_key(filters)}', FEED_CACHE_TTL,
+            lambda: fastjson.dumps(order_facets(cur, filters))
+        )
+        cur.close()
+        conn.close()
+        
+        return responses.build(200, body, event.get('headers'), conditional.cache_headers(etag, FEED_CACHE_CONTROL))
+    
+    if action == 'recommended':
+        if not freelancer_id:
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'freelancer_id required'}),
+                'isBase64Encoded': False
+            }
+        
+        try:
+            freelancer_user_id = int(freelancer_id)
+            limit = max(1, min(int(query_params.get('limit', RECOMMENDED_LIMIT)), MAX_RECOMMENDED_LIMIT))
+        except ValueError:
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'freelancer_id and limit must be integers'}),
+                'isBase64Encoded': False
+            }
+        orders = recommended_orders(cur, freelancer_user_id, limit)
+        cur.close()
+        conn.close()
+        
+        if orders is None:
+            return {
+                'statusCode': 404,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'Freelancer profile not found'}),
+                'isBase64Encoded': False
+            }
+        
+        return responses.build(200, fastjson.dumps({'orders': orders}), event.get('headers'))
+    
+    if action == 'inbox' and freelancer_id:
+        # Входящие от рассылки новых заказов; before_id - id последней записи предыдущей страницы
+        before_id = query_params.get('before_id')
+        if before_id and not before_id.isdigit():
+            cur.close()
+            conn.close()
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': 'before_id must be an integer'}),
+                'isBase64Encoded': False
+            }
+        cur.execute("""
             SELECT o.*, 
                    u.name as user_name, 
                    u.username,
-                   executor.name as executor_name,
-                   executor.username as executor_username,
+                   i.id as inbox_id,
+                   i.read_at
+            FROM t_p96553691_freelance_platform_c.freelancer_inbox i
+            JOIN t_p96553691_freelance_platform_c.orders o ON o.id = i.order_id
+            JOIN t_p96553691_freelance_platform_c.users u ON o.user_id = u.id 
+            WHERE i.user_id = %s AND (%s::bigint IS NULL OR i.id < %s::bigint)
+              AND o.status = 'active' AND o.deleted_at IS NULL
+            ORDER BY i.id DESC LIMIT %s
+        """, (int(freelancer_id), before_id, before_id, INBOX_LIMIT))
+        orders = [dict(row) for row in cur.fetchall()]
+        cur.close()
+        conn.close()
+        
+        return responses.build(200, fastjson.dumps({'orders': orders}), event.get('headers'))
+    
+    columns, joins = order_projection(fields)
+    if freelancer_id:
+        query = f"""
+            SELECT {columns},
                    r.status as response_status
             FROM t_p96553691_freelance_platform_c.orders o 
-            JOIN t_p96553691_freelance_platform_c.users u ON o.user_id = u.id 
-            LEFT JOIN t_p96553691_freelance_platform_c.users executor ON o.executor_id = executor.id
+            {joins}
             JOIN t_p96553691_freelance_platform_c.order_responses r ON r.order_id = o.id
-            WHERE r.freelancer_id = %s
+            WHERE r.freelancer_id = %s AND o.deleted_at IS NULL
             ORDER BY r.created_at DESC LIMIT 100
         """
         params = [int(freelancer_id)]
     else:
-        query = """
-            SELECT o.*, 
-                   u.name as user_name, 
-                   u.username,
-                   executor.name as executor_name,
-                   executor.username as executor_username
+        query = f"""
+            SELECT {columns}
             FROM t_p96553691_freelance_platform_c.orders o 
-            JOIN t_p96553691_freelance_platform_c.users u ON o.user_id = u.id 
-            LEFT JOIN t_p96553691_freelance_platform_c.users executor ON o.executor_id = executor.id
-            WHERE 1=1
+            {joins}
+            WHERE o.deleted_at IS NULL
         """
-        params = []
-        
-        if user_id:
-            query += " AND o.user_id = %s"
-            params.append(int(user_id))
-        
-        if category:
-            query += " AND o.category = %s"
-            params.append(category)
-        
-        if status:
-            query += " AND o.status = %s"
-            params.append(status)
+        conditions, params = feed_filters(filters)
+        query += conditions
         
         query += " ORDER BY o.created_at DESC LIMIT 100"
+        # Ленту собирает Postgres: Python передаёт готовый JSON-текст без разбора строк
+        query = fastjson.agg_sql(query, 't.created_at DESC, t.id DESC')
+    
+    etag = None
+    if not freelancer_id:
+        # Версия 'orders' берётся из кэша процесса — 304 отдаётся без запроса ленты
+        etag = conditional.make_etag(cache.versions(cur, ['orders']), filters_key(filters), fields)
+        if conditional.matches(event.get('headers'), etag):
+            cur.close()
+            conn.close()
+            return conditional.not_modified(etag, FEED_CACHE_CONTROL)
     
-    cur.execute(query, params)
-    orders = [dict(row) for row in cur.fetchall()]
+    def load_orders() -> str:
+        cur.execute(query, params)
+        if freelancer_id:
+            return fastjson.dumps({'orders': cur.fetchall()})
+        return '{"orders": ' + cur.fetchone()['data'] + '}'
+    
+    if freelancer_id:
+        response = responses.build(200, load_orders(), event.get('headers'))
+    else:
+        # Лента одинакова для всех посетителей; версия 'orders' увеличивается при записи заказов.
+        # Сжатые варианты кэшируются рядом с телом под ключом с суффиксом кодирования
+        feed_key = f"feed:{filters_key(filters)}:{','.join(fields) if fields else 'full'}"
+        body = cache.get_or_compute(cur, ['orders'], feed_key, FEED_CACHE_TTL, load_orders)
+        response = responses.build(
+            200, body, event.get('headers'),
+            conditional.cache_headers(etag, FEED_CACHE_CONTROL),
+            encoded=lambda encoding: cache.get_or_compute(
+                cur, ['orders'], f'{feed_key}#{encoding}', FEED_CACHE_TTL,
+                lambda: responses.encode(body, encoding)
+            )
+        )
     
     cur.close()
     conn.close()
     
-    for order in orders:
-        order['created_at'] = order['created_at'].isoformat() if order.get('created_at') else None
-        order['updated_at'] = order['updated_at'].isoformat() if order.get('updated_at') else None
-        order['deadline'] = order['deadline'].isoformat() if order.get('deadline') else None
-    
-    return {
-        'statusCode': 200,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({'orders': orders}),
-        'isBase64Encoded': False
-    }
\ No newline at end of file
+    return response
\ No newline at end of file
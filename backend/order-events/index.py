@@ -0,0 +1,71 @@
+import json
+import os
+import time
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+import events
+
+SCHEMA = 't_p96553691_freelance_platform_c'
+RETENTION = '7 days'
+ROWS_PER_BATCH = 5000
+TIME_BUDGET = 20
+
+def handler(event: dict, context) -> dict:
+    """Обслуживание журнала событий заказов: отставание потребителей и удаление прочитанных событий старше RETENTION. Запускается по таймеру."""
+    if 'httpMethod' in event:
+        headers = event.get('headers') or {}
+        secret = headers.get('X-Cron-Secret') or headers.get('x-cron-secret')
+        if not os.environ.get('CRON_SECRET') or secret != os.environ['CRON_SECRET']:
+            return {
+                'statusCode': 403,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Forbidden'})
+            }
+
+    deadline = time.monotonic() + TIME_BUDGET
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    pruned = 0
+    done = False
+
+    try:
+        consumers = events.lag(cur)
+        conn.commit()
+
+        # Удаляются только события, которые прочитали все потребители
+        while time.monotonic() < deadline:
+            cur.execute(f"""
+                WITH horizon AS (
+                    SELECT MIN(last_txid) AS last_txid FROM {SCHEMA}.event_consumers
+                )
+                DELETE FROM {SCHEMA}.order_events
+                WHERE id IN (
+                    SELECT e.id FROM {SCHEMA}.order_events e, horizon h
+                    WHERE e.created_at < NOW() - INTERVAL '{RETENTION}'
+                      AND (h.last_txid IS NULL OR e.txid < h.last_txid)
+                    LIMIT %s
+                )
+            """, (ROWS_PER_BATCH,))
+            deleted = cur.rowcount
+            conn.commit()
+            pruned += deleted
+            if deleted < ROWS_PER_BATCH:
+                done = True
+                break
+    except Exception as e:
+        conn.rollback()
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': str(e), 'pruned': pruned})
+        }
+    finally:
+        cur.close()
+        conn.close()
+
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({'consumers': consumers, 'pruned': pruned, 'done': done}, default=str)
+    }
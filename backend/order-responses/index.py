@@ -1,8 +1,35 @@
+import base64
 import json
 import os
+import re
+from datetime import datetime
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+import cache
+import events
+import session
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+MAX_BULK_RESPONSES = 1000
+MAX_RESPONSE_ID = 2 ** 31 - 1
+
+CURSOR_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,6})?([+-]\d{2}(:?\d{2})?)?$')
+
+def encode_cursor(created_at: str, response_id: int) -> str:
+    return base64.urlsafe_b64encode(f'{created_at}|{response_id}'.encode()).decode()
+
+def decode_cursor(cursor):
+    '''Позиция из курсора; ValueError - если курсор повреждён.'''
+    if not cursor:
+        return None, None
+    created_at, response_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    if not CURSOR_TIMESTAMP.match(created_at):
+        raise ValueError('bad cursor')
+    datetime.strptime(created_at[:19].replace(' ', 'T'), '%Y-%m-%dT%H:%M:%S')
+    return created_at, int(response_id)
+
 def handler(event: dict, context) -> dict:
     '''API для работы с откликами на заказы'''
     method = event.get('httpMethod', 'GET')
@@ -13,7 +40,7 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
@@ -21,9 +48,14 @@ def handler(event: dict, context) -> dict:
         }
 
     headers = event.get('headers', {})
-    user_id_str = headers.get('X-User-Id') or headers.get('x-user-id')
+    dsn = os.environ.get('DATABASE_URL')
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    user_id = session.authenticate(cur, headers)
     
-    if not user_id_str:
+    if not user_id:
+        cur.close()
+        conn.close()
         return {
             'statusCode': 401,
             'headers': {
@@ -34,11 +66,6 @@ def handler(event: dict, context) -> dict:
             'isBase64Encoded': False
         }
 
-    user_id = int(user_id_str)
-    dsn = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(dsn)
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
     try:
         if method == 'GET':
             query_params = event.get('queryStringParameters') or {}
@@ -56,20 +83,84 @@ def handler(event: dict, context) -> dict:
                     ORDER BY r.created_at DESC
                 """, (int(order_id),))
             else:
-                cur.execute("""
+                # Две ветки по своим индексам вместо OR по JOIN: мои отклики
+                # (freelancer_id, created_at) и отклики на мои заказы (order_id, created_at)
+                role = query_params.get('role')
+                status = query_params.get('status')
+                try:
+                    limit = max(1, min(int(query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+                    cursor_at, cursor_id = decode_cursor(query_params.get('cursor'))
+                except ValueError:
+                    return {
+                        'statusCode': 400,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({'error': 'Неверный limit или cursor'}),
+                        'isBase64Encoded': False
+                    }
+
+                filters = ""
+                if status:
+                    filters += " AND r.status = %(status)s"
+                if cursor_at:
+                    filters += " AND (r.created_at, r.id) < (%(cursor_at)s::timestamp, %(cursor_id)s)"
+
+                branches = []
+                if role in (None, 'freelancer'):
+                    branches.append(f"""
+                        (SELECT r.*, 'freelancer' AS role
+                         FROM t_p96553691_freelance_platform_c.order_responses r
+                         JOIN t_p96553691_freelance_platform_c.orders fo ON fo.id = r.order_id
+                         WHERE r.freelancer_id = %(user_id)s AND fo.deleted_at IS NULL{filters}
+                         ORDER BY r.created_at DESC, r.id DESC
+                         LIMIT %(limit)s)
+                    """)
+                if role in (None, 'client'):
+                    branches.append(f"""
+                        (SELECT r.*, 'client' AS role
+                         FROM t_p96553691_freelance_platform_c.orders mo
+                         JOIN t_p96553691_freelance_platform_c.order_responses r ON r.order_id = mo.id
+                         WHERE mo.user_id = %(user_id)s AND mo.deleted_at IS NULL{filters}
+                         ORDER BY r.created_at DESC, r.id DESC
+                         LIMIT %(limit)s)
+                    """)
+                if not branches:
+                    return {
+                        'statusCode': 400,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({'error': 'role должен быть freelancer или client'}),
+                        'isBase64Encoded': False
+                    }
+
+                cur.execute(f"""
                     SELECT 
-                        r.*,
+                        x.*,
                         u.name as freelancer_name,
                         u.username as freelancer_username,
                         o.title as order_title
-                    FROM t_p96553691_freelance_platform_c.order_responses r
-                    JOIN t_p96553691_freelance_platform_c.users u ON r.freelancer_id = u.id
-                    JOIN t_p96553691_freelance_platform_c.orders o ON r.order_id = o.id
-                    WHERE r.freelancer_id = %s OR o.user_id = %s
-                    ORDER BY r.created_at DESC
-                """, (user_id, user_id))
+                    FROM ({' UNION ALL '.join(branches)}) x
+                    JOIN t_p96553691_freelance_platform_c.users u ON x.freelancer_id = u.id
+                    JOIN t_p96553691_freelance_platform_c.orders o ON x.order_id = o.id
+                    ORDER BY x.created_at DESC, x.id DESC
+                    LIMIT %(limit)s
+                """, {
+                    'user_id': user_id,
+                    'status': status,
+                    'cursor_at': cursor_at,
+                    'cursor_id': cursor_id,
+                    'limit': limit + 1
+                })
             
             responses = [dict(row) for row in cur.fetchall()]
+            next_cursor = None
+            if not order_id and len(responses) > limit:
+                responses = responses[:limit]
+                next_cursor = encode_cursor(responses[-1]['created_at'].isoformat(), responses[-1]['id'])
             for resp in responses:
                 resp['created_at'] = resp['created_at'].isoformat() if resp.get('created_at') else None
             
@@ -79,7 +170,7 @@ def handler(event: dict, context) -> dict:
                     'Content-Type': 'application/json',
                     'Access-Control-Allow-Origin': '*'
                 },
-                'body': json.dumps({'responses': responses}),
+                'body': json.dumps({'responses': responses, 'next_cursor': next_cursor}),
                 'isBase64Encoded': False
             }
 
@@ -100,12 +191,40 @@ def handler(event: dict, context) -> dict:
                     'isBase64Encoded': False
                 }
 
+            # Проверка владельца, вставка с защитой от дубля и счётчик откликов — одним запросом
             cur.execute("""
-                SELECT user_id FROM t_p96553691_freelance_platform_c.orders WHERE id = %s
-            """, (order_id,))
-            order = cur.fetchone()
-
-            if not order:
+                WITH target AS (
+                    SELECT id, user_id FROM t_p96553691_freelance_platform_c.orders
+                    WHERE id = %(order_id)s AND deleted_at IS NULL
+                ),
+                inserted AS (
+                    INSERT INTO t_p96553691_freelance_platform_c.order_responses 
+                    (order_id, freelancer_id, message, proposed_price, status)
+                    SELECT t.id, %(user_id)s, %(message)s, %(proposed_price)s, 'pending'
+                    FROM target t
+                    WHERE t.user_id <> %(user_id)s
+                    ON CONFLICT (order_id, freelancer_id) DO NOTHING
+                    RETURNING id, order_id, freelancer_id, message, proposed_price, status, created_at
+                ),
+                counted AS (
+                    UPDATE t_p96553691_freelance_platform_c.orders
+                    SET response_count = response_count + 1
+                    WHERE id IN (SELECT order_id FROM inserted)
+                    RETURNING response_count
+                )
+                SELECT
+                    (SELECT user_id FROM target) AS order_owner_id,
+                    (SELECT row_to_json(inserted) FROM inserted) AS response,
+                    (SELECT response_count FROM counted) AS response_count
+            """, {
+                'order_id': order_id,
+                'user_id': user_id,
+                'message': message,
+                'proposed_price': proposed_price
+            })
+            result = cur.fetchone()
+
+            if result['order_owner_id'] is None:
                 return {
                     'statusCode': 404,
                     'headers': {
@@ -116,7 +235,7 @@ def handler(event: dict, context) -> dict:
                     'isBase64Encoded': False
                 }
 
-            if order['user_id'] == user_id:
+            if result['order_owner_id'] == user_id:
                 return {
                     'statusCode': 400,
                     'headers': {
@@ -127,13 +246,7 @@ def handler(event: dict, context) -> dict:
                     'isBase64Encoded': False
                 }
 
-            cur.execute("""
-                SELECT id FROM t_p96553691_freelance_platform_c.order_responses 
-                WHERE order_id = %s AND freelancer_id = %s
-            """, (order_id, user_id))
-            
-            existing = cur.fetchone()
-            if existing:
+            if result['response'] is None:
                 return {
                     'statusCode': 400,
                     'headers': {
@@ -144,18 +257,15 @@ def handler(event: dict, context) -> dict:
                     'isBase64Encoded': False
                 }
 
-            cur.execute("""
-                INSERT INTO t_p96553691_freelance_platform_c.order_responses 
-                (order_id, freelancer_id, message, proposed_price, status)
-                VALUES (%s, %s, %s, %s, 'pending')
-                RETURNING id, order_id, freelancer_id, message, proposed_price, status, created_at
-            """, (order_id, user_id, message, proposed_price))
-
-            response = cur.fetchone()
+            resp_dict = result['response']
+            events.emit(cur, events.RESPONSE_CREATED, user_id, [
+                (order_id, {'response_id': resp_dict['id'], 'freelancer_id': user_id})
+            ])
+            # response_count входит в ленту: её кэш и ETag зависят от версии 'orders'
+            cache.bump(cur, 'orders')
             conn.commit()
 
-            resp_dict = dict(response)
-            resp_dict['created_at'] = resp_dict['created_at'].isoformat() if resp_dict.get('created_at') else None
+            resp_dict['response_count'] = result['response_count']
 
             return {
                 'statusCode': 201,
@@ -182,16 +292,68 @@ def handler(event: dict, context) -> dict:
                         'isBase64Encoded': False
                     }
 
+                # Перенос заказа в историю одной цепочкой CTE: удаление откликов и заказа,
+                # вставка в completed_orders, приглашения к отзывам и +1 к completed_projects
                 cur.execute("""
-                    SELECT o.*, u.name as client_name, ex.name as executor_name
-                    FROM t_p96553691_freelance_platform_c.orders o
-                    JOIN t_p96553691_freelance_platform_c.users u ON o.user_id = u.id
-                    LEFT JOIN t_p96553691_freelance_platform_c.users ex ON o.executor_id = ex.id
-                    WHERE o.id = %s AND o.status = 'in_progress'
-                """, (order_id,))
+                    WITH target AS (
+                        SELECT id, user_id, status
+                        FROM t_p96553691_freelance_platform_c.orders
+                        WHERE id = %(order_id)s AND deleted_at IS NULL
+                    ),
+                    allowed AS (
+                        SELECT id FROM target
+                        WHERE user_id = %(user_id)s AND status = 'in_progress'
+                    ),
+                    removed_responses AS (
+                        DELETE FROM t_p96553691_freelance_platform_c.order_responses
+                        WHERE order_id IN (SELECT id FROM allowed)
+                    ),
+                    moved AS (
+                        DELETE FROM t_p96553691_freelance_platform_c.orders
+                        WHERE id IN (SELECT id FROM allowed)
+                        RETURNING *
+                    ),
+                    completed AS (
+                        INSERT INTO t_p96553691_freelance_platform_c.completed_orders
+                            (order_id, title, description, category, budget_min, budget_max,
+                             client_id, client_name, executor_id, executor_name)
+                        SELECT
+                            m.id, m.title, m.description, m.category, m.budget_min, m.budget_max,
+                            m.user_id, u.name, m.executor_id, ex.name
+                        FROM moved m
+                        JOIN t_p96553691_freelance_platform_c.users u ON m.user_id = u.id
+                        LEFT JOIN t_p96553691_freelance_platform_c.users ex ON m.executor_id = ex.id
+                        RETURNING id, title, client_id, client_name, executor_id, executor_name
+                    ),
+                    prompts AS (
+                        INSERT INTO t_p96553691_freelance_platform_c.pending_reviews
+                            (reviewer_id, completed_order_id, reviewee_id, role, order_title, reviewee_name)
+                        SELECT client_id, id, executor_id, 'client', title, executor_name
+                        FROM completed WHERE executor_id IS NOT NULL
+                        UNION ALL
+                        SELECT executor_id, id, client_id, 'freelancer', title, client_name
+                        FROM completed WHERE executor_id IS NOT NULL
+                        ON CONFLICT (reviewer_id, completed_order_id) DO NOTHING
+                    ),
+                    counted AS (
+                        UPDATE t_p96553691_freelance_platform_c.freelancers f
+                        SET completed_projects = f.completed_projects + 1
+                        FROM completed c
+                        WHERE f.user_id = c.executor_id
+                    )
+                    SELECT
+                        t.user_id AS order_owner_id,
+                        t.status,
+                        c.id AS completed_order_id,
+                        c.title,
+                        c.executor_id,
+                        c.executor_name
+                    FROM target t
+                    LEFT JOIN completed c ON TRUE
+                """, {'order_id': order_id, 'user_id': user_id})
                 order = cur.fetchone()
 
-                if not order:
+                if not order or order['status'] != 'in_progress':
                     return {
                         'statusCode': 404,
                         'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -199,7 +361,7 @@ def handler(event: dict, context) -> dict:
                         'isBase64Encoded': False
                     }
 
-                if order['user_id'] != user_id:
+                if order['order_owner_id'] != user_id:
                     return {
                         'statusCode': 403,
                         'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -207,37 +369,11 @@ def handler(event: dict, context) -> dict:
                         'isBase64Encoded': False
                     }
 
-                cur.execute("""
-                    INSERT INTO t_p96553691_freelance_platform_c.completed_orders
-                        (order_id, title, description, category, budget_min, budget_max,
-                         client_id, client_name, executor_id, executor_name)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    order['id'], order['title'], order['description'], order['category'],
-                    order['budget_min'], order['budget_max'],
-                    order['user_id'], order['client_name'],
-                    order['executor_id'], order['executor_name']
-                ))
-                completed_order_id = cur.fetchone()['id']
-
-                if order['executor_id']:
-                    cur.execute("""
-                        UPDATE t_p96553691_freelance_platform_c.freelancers f
-                        SET completed_projects = (
-                            SELECT COUNT(*) FROM t_p96553691_freelance_platform_c.completed_orders
-                            WHERE executor_id = %s
-                        ) + 1
-                        WHERE f.user_id = %s
-                    """, (order['executor_id'], order['executor_id']))
-
-                cur.execute("""
-                    DELETE FROM t_p96553691_freelance_platform_c.order_responses WHERE order_id = %s
-                """, (order['id'],))
-                cur.execute("""
-                    DELETE FROM t_p96553691_freelance_platform_c.orders WHERE id = %s
-                """, (order['id'],))
-
+                events.emit(cur, events.ORDER_COMPLETED, user_id, [(order_id, {
+                    'completed_order_id': order['completed_order_id'],
+                    'executor_id': order['executor_id']
+                })])
+                cache.bump(cur, 'orders', 'freelancers')
                 conn.commit()
                 return {
                     'statusCode': 200,
@@ -245,7 +381,7 @@ def handler(event: dict, context) -> dict:
                     'body': json.dumps({
                         'success': True,
                         'message': 'Заказ подтверждён и сохранён в историю',
-                        'completed_order_id': completed_order_id,
+                        'completed_order_id': order['completed_order_id'],
                         'executor_id': order['executor_id'],
                         'executor_name': order['executor_name'],
                         'order_title': order['title'],
@@ -253,6 +389,53 @@ def handler(event: dict, context) -> dict:
                     'isBase64Encoded': False
                 }
 
+            if action == 'bulk_reject':
+                response_ids = body.get('response_ids') or []
+                if not isinstance(response_ids, list) or not response_ids or len(response_ids) > MAX_BULK_RESPONSES:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': f'response_ids должен содержать от 1 до {MAX_BULK_RESPONSES} откликов'}),
+                        'isBase64Encoded': False
+                    }
+                if not all(type(rid) is int and 0 < rid <= MAX_RESPONSE_ID for rid in response_ids):
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'response_ids должен содержать только положительные целые id'}),
+                        'isBase64Encoded': False
+                    }
+
+                cur.execute("""
+                    UPDATE t_p96553691_freelance_platform_c.order_responses r
+                    SET status = 'rejected'
+                    FROM t_p96553691_freelance_platform_c.orders o
+                    WHERE r.id = ANY(%s)
+                      AND r.status = 'pending'
+                      AND o.id = r.order_id
+                      AND o.user_id = %s
+                    RETURNING r.id, r.order_id, r.freelancer_id
+                """, (response_ids, user_id))
+                rows = cur.fetchall()
+                rejected = [row['id'] for row in rows]
+                events.emit(cur, events.RESPONSE_REJECTED, user_id, [
+                    (row['order_id'], {'response_id': row['id'], 'freelancer_id': row['freelancer_id']})
+                    for row in rows
+                ])
+                conn.commit()
+                rejected_set = set(rejected)
+
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'success': True,
+                        'rejected': rejected,
+                        'skipped': [rid for rid in response_ids if rid not in rejected_set]
+                    }),
+                    'isBase64Encoded': False
+                }
+
             if not response_id or not action:
                 return {
                     'statusCode': 400,
@@ -264,86 +447,110 @@ def handler(event: dict, context) -> dict:
                     'isBase64Encoded': False
                 }
 
-            cur.execute("""
-                SELECT r.*, o.user_id as order_owner_id
-                FROM t_p96553691_freelance_platform_c.order_responses r
-                JOIN t_p96553691_freelance_platform_c.orders o ON r.order_id = o.id
-                WHERE r.id = %s
-            """, (response_id,))
-            
-            response = cur.fetchone()
-            if not response:
+            if action not in ('accept', 'reject'):
                 return {
-                    'statusCode': 404,
+                    'statusCode': 400,
                     'headers': {
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps({'error': 'Отклик не найден'}),
+                    'body': json.dumps({'error': 'Неизвестное действие'}),
                     'isBase64Encoded': False
                 }
 
-            if response['order_owner_id'] != user_id:
+            # Один запрос на действие: проверка владельца и все изменения статусов.
+            # accept принимает отклик, отклоняет остальные ожидающие по заказу и
+            # переводит заказ в работу; reject отклоняет один отклик
+            cur.execute("""
+                WITH target AS (
+                    SELECT r.id, r.order_id, r.freelancer_id, o.user_id AS order_owner_id
+                    FROM t_p96553691_freelance_platform_c.order_responses r
+                    JOIN t_p96553691_freelance_platform_c.orders o ON r.order_id = o.id
+                    WHERE r.id = %(response_id)s AND o.deleted_at IS NULL
+                ),
+                allowed AS (
+                    SELECT * FROM target WHERE order_owner_id = %(user_id)s
+                ),
+                updated AS (
+                    UPDATE t_p96553691_freelance_platform_c.order_responses r
+                    SET status = CASE WHEN r.id = a.id AND %(action)s = 'accept' THEN 'accepted' ELSE 'rejected' END
+                    FROM allowed a
+                    WHERE r.order_id = a.order_id
+                      AND (r.id = a.id OR (%(action)s = 'accept' AND r.status = 'pending'))
+                    RETURNING r.id
+                ),
+                started AS (
+                    UPDATE t_p96553691_freelance_platform_c.orders o
+                    SET status = 'in_progress', executor_id = a.freelancer_id
+                    FROM allowed a
+                    WHERE o.id = a.order_id AND %(action)s = 'accept'
+                    RETURNING o.id
+                )
+                SELECT
+                    (SELECT order_owner_id FROM target) AS order_owner_id,
+                    (SELECT order_id FROM target) AS order_id,
+                    (SELECT freelancer_id FROM target) AS freelancer_id,
+                    (SELECT COUNT(*) FROM updated) AS updated_count,
+                    (SELECT COUNT(*) FROM started) AS started_count
+            """, {'response_id': response_id, 'user_id': user_id, 'action': action})
+            result = cur.fetchone()
+
+            if result['order_owner_id'] is None:
                 return {
-                    'statusCode': 403,
+                    'statusCode': 404,
                     'headers': {
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps({'error': 'Только владелец заказа может принимать отклики'}),
+                    'body': json.dumps({'error': 'Отклик не найден'}),
                     'isBase64Encoded': False
                 }
 
-            if action == 'accept':
-                cur.execute("""
-                    UPDATE t_p96553691_freelance_platform_c.order_responses 
-                    SET status = 'accepted'
-                    WHERE id = %s
-                """, (response_id,))
-
-                cur.execute("""
-                    UPDATE t_p96553691_freelance_platform_c.orders 
-                    SET status = 'in_progress', executor_id = %s
-                    WHERE id = %s
-                """, (response['freelancer_id'], response['order_id']))
-
-                cur.execute("""
-                    UPDATE t_p96553691_freelance_platform_c.order_responses 
-                    SET status = 'rejected'
-                    WHERE order_id = %s AND id != %s AND status = 'pending'
-                """, (response['order_id'], response_id))
-
-                conn.commit()
-
+            if result['order_owner_id'] != user_id:
                 return {
-                    'statusCode': 200,
+                    'statusCode': 403,
                     'headers': {
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps({'success': True, 'message': 'Отклик принят, заказ в работе'}),
+                    'body': json.dumps({'error': 'Только владелец заказа может принимать отклики'}),
                     'isBase64Encoded': False
                 }
 
-            elif action == 'reject':
-                cur.execute("""
-                    UPDATE t_p96553691_freelance_platform_c.order_responses 
-                    SET status = 'rejected'
-                    WHERE id = %s
-                """, (response_id,))
-
-                conn.commit()
+            event_type = events.RESPONSE_ACCEPTED if action == 'accept' else events.RESPONSE_REJECTED
+            event_payload = {'response_id': response_id, 'freelancer_id': result['freelancer_id']}
+            if action == 'accept':
+                event_payload['rejected_count'] = result['updated_count'] - 1
+            events.emit(cur, event_type, user_id, [(result['order_id'], event_payload)])
+            if action == 'accept':
+                cache.bump(cur, 'orders')
+            conn.commit()
 
+            if action == 'accept':
                 return {
                     'statusCode': 200,
                     'headers': {
                         'Content-Type': 'application/json',
                         'Access-Control-Allow-Origin': '*'
                     },
-                    'body': json.dumps({'success': True, 'message': 'Отклик отклонен'}),
+                    'body': json.dumps({
+                        'success': True,
+                        'message': 'Отклик принят, заказ в работе',
+                        'rejected_count': result['updated_count'] - 1
+                    }),
                     'isBase64Encoded': False
                 }
 
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'success': True, 'message': 'Отклик отклонен'}),
+                'isBase64Encoded': False
+            }
+
         return {
             'statusCode': 400,
             'headers': {
@@ -0,0 +1,164 @@
+import json
+import os
+import time
+import boto3
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+SCHEMA = 't_p96553691_freelance_platform_c'
+GRACE_PERIOD = '5 minutes'
+ORDERS_PER_PASS = 50
+ROWS_PER_BATCH = 500
+BATCH_PAUSE = 0.05
+TIME_BUDGET = 20
+S3_DELETE_LIMIT = 1000
+
+def get_s3():
+    return boto3.client(
+        's3',
+        endpoint_url='https://bucket.poehali.dev',
+        aws_access_key_id=os.environ['AWS_ACCESS_KEY_ID'],
+        aws_secret_access_key=os.environ['AWS_SECRET_ACCESS_KEY'],
+    )
+
+def file_key(file_url: str):
+    if file_url and '/bucket/' in file_url:
+        return file_url.split('/bucket/', 1)[1]
+    return None
+
+def delete_files(keys):
+    s3 = get_s3()
+    for i in range(0, len(keys), S3_DELETE_LIMIT):
+        chunk = keys[i:i + S3_DELETE_LIMIT]
+        s3.delete_objects(Bucket='files', Delete={'Objects': [{'Key': k} for k in chunk], 'Quiet': True})
+
+def delete_in_batches(conn, cur, sql: str, params: dict, deadline: float, collect=None) -> bool:
+    '''Удаляет строки порциями по ROWS_PER_BATCH с коммитом и паузой между порциями.'''
+    while time.monotonic() < deadline:
+        cur.execute(sql, {**params, 'batch': ROWS_PER_BATCH})
+        rows = cur.fetchall()
+        conn.commit()
+        if collect is not None:
+            collect(rows)
+        if len(rows) < ROWS_PER_BATCH:
+            return True
+        time.sleep(BATCH_PAUSE)
+    return False
+
+def delete_messages(conn, cur, order_ids, deadline: float, counted: dict) -> bool:
+    '''
+    Удаляет сообщения чатов заказов порциями. Файлы порции удаляются из S3 до удаления
+    строк: при сбое S3 строки остаются, и следующий запуск повторит удаление файлов.
+    '''
+    while time.monotonic() < deadline:
+        cur.execute(f"""
+            SELECT m.id, m.file_url FROM {SCHEMA}.messages m
+            JOIN {SCHEMA}.chats c ON m.chat_id = c.id
+            WHERE c.order_id = ANY(%s)
+            LIMIT %s
+        """, (order_ids, ROWS_PER_BATCH))
+        rows = cur.fetchall()
+        conn.commit()
+        files = [k for k in (file_key(r['file_url']) for r in rows) if k]
+        if files:
+            delete_files(files)
+        if rows:
+            cur.execute(f"DELETE FROM {SCHEMA}.messages WHERE id = ANY(%s)", ([r['id'] for r in rows],))
+            conn.commit()
+        counted['messages'] += len(rows)
+        counted['files'] += len(files)
+        if len(rows) < ROWS_PER_BATCH:
+            return True
+        time.sleep(BATCH_PAUSE)
+    return False
+
+def handler(event: dict, context) -> dict:
+    """Фоновая очистка мягко удалённых заказов: отклики, чаты, сообщения и файлы удаляются порциями. Запускается по таймеру."""
+    if 'httpMethod' in event:
+        headers = event.get('headers') or {}
+        secret = headers.get('X-Cron-Secret') or headers.get('x-cron-secret')
+        if not os.environ.get('CRON_SECRET') or secret != os.environ['CRON_SECRET']:
+            return {
+                'statusCode': 403,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Forbidden'})
+            }
+
+    deadline = time.monotonic() + TIME_BUDGET
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    totals = {'orders': 0, 'responses': 0, 'messages': 0, 'chats': 0, 'files': 0}
+    done = False
+
+    try:
+        while time.monotonic() < deadline:
+            # Заказы, на которые ссылаются транзакции, остаются в таблице как скрытые записи:
+            # чистятся только их дочерние данные
+            cur.execute(f"""
+                SELECT o.id
+                FROM {SCHEMA}.orders o
+                WHERE o.deleted_at IS NOT NULL
+                  AND o.deleted_at < NOW() - INTERVAL '{GRACE_PERIOD}'
+                  AND (
+                      NOT EXISTS (SELECT 1 FROM {SCHEMA}.transactions t WHERE t.order_id = o.id)
+                      OR EXISTS (SELECT 1 FROM {SCHEMA}.order_responses r WHERE r.order_id = o.id)
+                      OR EXISTS (SELECT 1 FROM {SCHEMA}.chats c WHERE c.order_id = o.id)
+                  )
+                ORDER BY o.deleted_at
+                LIMIT %s
+            """, (ORDERS_PER_PASS,))
+            order_ids = [row['id'] for row in cur.fetchall()]
+            conn.commit()
+            if not order_ids:
+                done = True
+                break
+
+            params = {'order_ids': order_ids}
+            counted = {'responses': 0, 'messages': 0, 'files': 0}
+
+            def count_responses(rows):
+                counted['responses'] += len(rows)
+
+            finished = delete_in_batches(conn, cur, f"""
+                DELETE FROM {SCHEMA}.order_responses
+                WHERE id IN (
+                    SELECT id FROM {SCHEMA}.order_responses
+                    WHERE order_id = ANY(%(order_ids)s)
+                    LIMIT %(batch)s
+                )
+                RETURNING id
+            """, params, deadline, count_responses)
+
+            finished = finished and delete_messages(conn, cur, order_ids, deadline, counted)
+
+            if finished:
+                cur.execute(f"DELETE FROM {SCHEMA}.chats WHERE order_id = ANY(%s)", (order_ids,))
+                totals['chats'] += cur.rowcount
+                cur.execute(f"""
+                    DELETE FROM {SCHEMA}.orders o
+                    WHERE o.id = ANY(%s)
+                      AND NOT EXISTS (SELECT 1 FROM {SCHEMA}.transactions t WHERE t.order_id = o.id)
+                """, (order_ids,))
+                totals['orders'] += cur.rowcount
+                conn.commit()
+
+            totals['responses'] += counted['responses']
+            totals['messages'] += counted['messages']
+            totals['files'] += counted['files']
+            time.sleep(BATCH_PAUSE)
+    except Exception as e:
+        conn.rollback()
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': str(e), **totals})
+        }
+    finally:
+        cur.close()
+        conn.close()
+
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({**totals, 'done': done})
+    }
@@ -0,0 +1,167 @@
+import json
+import os
+import time
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+SCHEMA = 't_p96553691_freelance_platform_c'
+BATCH_SIZE = 500
+TIME_BUDGET = 20
+
+def reconcile_batch(cur, after_id: int) -> dict:
+    '''Сверяет агрегаты для пачки пользователей с id > after_id и чинит расхождения.'''
+    cur.execute(f"""
+        WITH ids AS (
+            SELECT id FROM {SCHEMA}.users
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+        ),
+        actual AS (
+            SELECT
+                reviewee_id,
+                role,
+                SUM(rating)::int AS rating_sum,
+                COUNT(*)::int AS rating_count,
+                COUNT(*) FILTER (WHERE rating = 1)::int AS stars_1,
+                COUNT(*) FILTER (WHERE rating = 2)::int AS stars_2,
+                COUNT(*) FILTER (WHERE rating = 3)::int AS stars_3,
+                COUNT(*) FILTER (WHERE rating = 4)::int AS stars_4,
+                COUNT(*) FILTER (WHERE rating = 5)::int AS stars_5
+            FROM {SCHEMA}.order_reviews
+            WHERE reviewee_id IN (SELECT id FROM ids)
+            GROUP BY reviewee_id, role
+        ),
+        stored AS (
+            SELECT * FROM {SCHEMA}.review_stats
+            WHERE reviewee_id IN (SELECT id FROM ids)
+        ),
+        drift AS (
+            SELECT
+                reviewee_id,
+                role,
+                COALESCE(a.rating_sum, 0) - COALESCE(s.rating_sum, 0) AS rating_sum,
+                COALESCE(a.rating_count, 0) - COALESCE(s.rating_count, 0) AS rating_count,
+                COALESCE(a.stars_1, 0) - COALESCE(s.stars_1, 0) AS stars_1,
+                COALESCE(a.stars_2, 0) - COALESCE(s.stars_2, 0) AS stars_2,
+                COALESCE(a.stars_3, 0) - COALESCE(s.stars_3, 0) AS stars_3,
+                COALESCE(a.stars_4, 0) - COALESCE(s.stars_4, 0) AS stars_4,
+                COALESCE(a.stars_5, 0) - COALESCE(s.stars_5, 0) AS stars_5
+            FROM actual a
+            FULL JOIN stored s USING (reviewee_id, role)
+            WHERE s.reviewee_id IS NULL
+               OR (COALESCE(a.rating_sum, 0), COALESCE(a.rating_count, 0),
+                   COALESCE(a.stars_1, 0), COALESCE(a.stars_2, 0), COALESCE(a.stars_3, 0),
+                   COALESCE(a.stars_4, 0), COALESCE(a.stars_5, 0))
+                  IS DISTINCT FROM
+                  (s.rating_sum, s.rating_count, s.stars_1, s.stars_2, s.stars_3, s.stars_4, s.stars_5)
+        ),
+        -- Расхождение прибавляется к текущей строке, а не перезаписывает её: отзыв,
+        -- зафиксированный после снимка этого запроса, уже добавил свою разность в
+        -- review_stats, и ON CONFLICT увидит её после ожидания блокировки строки
+        repaired AS (
+            INSERT INTO {SCHEMA}.review_stats AS rs
+                (reviewee_id, role, rating_sum, rating_count,
+                 stars_1, stars_2, stars_3, stars_4, stars_5)
+            SELECT * FROM drift
+            ON CONFLICT (reviewee_id, role) DO UPDATE SET
+                rating_sum = rs.rating_sum + EXCLUDED.rating_sum,
+                rating_count = rs.rating_count + EXCLUDED.rating_count,
+                stars_1 = rs.stars_1 + EXCLUDED.stars_1,
+                stars_2 = rs.stars_2 + EXCLUDED.stars_2,
+                stars_3 = rs.stars_3 + EXCLUDED.stars_3,
+                stars_4 = rs.stars_4 + EXCLUDED.stars_4,
+                stars_5 = rs.stars_5 + EXCLUDED.stars_5,
+                updated_at = NOW()
+            RETURNING reviewee_id
+        )
+        SELECT
+            (SELECT MAX(id) FROM ids) AS last_id,
+            (SELECT COUNT(*) FROM ids) AS processed,
+            (SELECT COUNT(*) FROM repaired) AS repaired_stats
+    """, (after_id, BATCH_SIZE))
+    result = dict(cur.fetchone())
+
+    if not result['processed']:
+        return result
+
+    # Отдельный запрос, чтобы видеть исправленные review_stats
+    cur.execute(f"""
+        UPDATE {SCHEMA}.freelancers f
+        SET
+            rating = expected.rating,
+            total_reviews = expected.total_reviews,
+            completed_projects = expected.completed_projects
+        FROM (
+            SELECT
+                f2.user_id,
+                COALESCE(ROUND(s.rating_sum::numeric / NULLIF(s.rating_count, 0), 2), 0) AS rating,
+                COALESCE(s.rating_count, 0) AS total_reviews,
+                (SELECT COUNT(*) FROM {SCHEMA}.completed_orders co
+                 WHERE co.executor_id = f2.user_id) AS completed_projects
+            FROM {SCHEMA}.freelancers f2
+            LEFT JOIN {SCHEMA}.review_stats s ON s.reviewee_id = f2.user_id AND s.role = 'client'
+            WHERE f2.user_id > %s AND f2.user_id <= %s
+        ) expected
+        WHERE f.user_id = expected.user_id
+          AND (f.rating, f.total_reviews, f.completed_projects)
+              IS DISTINCT FROM (expected.rating, expected.total_reviews, expected.completed_projects)
+    """, (after_id, result['last_id']))
+    result['repaired_freelancers'] = cur.rowcount
+    return result
+
+def handler(event: dict, context) -> dict:
+    """Сверка и исправление агрегатов рейтинга (review_stats, freelancers) пачками. Запускается по таймеру."""
+    if 'httpMethod' in event:
+        headers = event.get('headers') or {}
+        secret = headers.get('X-Cron-Secret') or headers.get('x-cron-secret')
+        if not os.environ.get('CRON_SECRET') or secret != os.environ['CRON_SECRET']:
+            return {
+                'statusCode': 403,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Forbidden'})
+            }
+
+    query_params = event.get('queryStringParameters') or {}
+    try:
+        after_id = int(query_params.get('after_id', 0))
+    except ValueError:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'after_id must be an integer'})
+        }
+    deadline = time.monotonic() + TIME_BUDGET
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    totals = {'processed': 0, 'repaired_stats': 0, 'repaired_freelancers': 0}
+    done = False
+    try:
+        while time.monotonic() < deadline:
+            result = reconcile_batch(cur, after_id)
+            conn.commit()
+            if not result['processed']:
+                done = True
+                break
+            after_id = result['last_id']
+            totals['processed'] += result['processed']
+            totals['repaired_stats'] += result['repaired_stats']
+            totals['repaired_freelancers'] += result['repaired_freelancers']
+    except Exception as e:
+        conn.rollback()
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': str(e), 'after_id': after_id})
+        }
+    finally:
+        cur.close()
+        conn.close()
+
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({**totals, 'after_id': after_id, 'done': done})
+    }
@@ -1,9 +1,37 @@
+import base64
 import json
 import os
+import re
+from datetime import datetime
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+import cache
+import conditional
+import events
+import session
+
 SCHEMA = 't_p96553691_freelance_platform_c'
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_PENDING = 50
+REVIEWS_CACHE_TTL = 60
+REVIEWS_CACHE_CONTROL = 'private, no-cache'
+
+CURSOR_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,6})?([+-]\d{2}(:?\d{2})?)?$')
+
+def encode_cursor(created_at: str, review_id: int) -> str:
+    return base64.urlsafe_b64encode(f'{created_at}|{review_id}'.encode()).decode()
+
+def decode_cursor(cursor):
+    '''Позиция из курсора; ValueError - если курсор повреждён.'''
+    if not cursor:
+        return None, None
+    created_at, review_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    if not CURSOR_TIMESTAMP.match(created_at):
+        raise ValueError('bad cursor')
+    datetime.strptime(created_at[:19].replace(' ', 'T'), '%Y-%m-%dT%H:%M:%S')
+    return created_at, int(review_id)
 
 def handler(event: dict, context) -> dict:
     """Отзывы после завершения заказа: создание и получение."""
@@ -13,28 +41,29 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token, If-None-Match',
                 'Access-Control-Max-Age': '86400'
             },
             'body': ''
         }
 
     headers = event.get('headers', {})
-    user_id_str = headers.get('X-User-Id') or headers.get('x-user-id')
-    if not user_id_str:
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    user_id = session.authenticate(cur, headers)
+    if not user_id:
+        cur.close()
+        conn.close()
         return {
             'statusCode': 401,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
             'body': json.dumps({'error': 'Требуется авторизация'})
         }
 
-    user_id = int(user_id_str)
     method = event.get('httpMethod', 'GET')
     query_params = event.get('queryStringParameters') or {}
 
-    conn = psycopg2.connect(os.environ['DATABASE_URL'])
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
     def resp(status, data):
         return {
             'statusCode': status,
@@ -47,67 +76,122 @@ def handler(event: dict, context) -> dict:
             action = query_params.get('action', 'list')
 
             if action == 'pending':
+                try:
+                    limit = max(1, min(int(query_params.get('limit', 1)), MAX_PENDING))
+                except ValueError:
+                    return resp(400, {'error': 'Неверный limit'})
                 cur.execute(f"""
                     SELECT
-                        co.id as completed_order_id,
-                        co.title as order_title,
-                        co.client_id,
-                        co.client_name,
-                        co.executor_id,
-                        co.executor_name
-                    FROM {SCHEMA}.completed_orders co
-                    WHERE (co.client_id = %s OR co.executor_id = %s)
-                      AND NOT EXISTS (
-                          SELECT 1 FROM {SCHEMA}.order_reviews r
-                          WHERE r.completed_order_id = co.id AND r.reviewer_id = %s
-                      )
-                    ORDER BY co.completed_at DESC
-                    LIMIT 1
-                """, (user_id, user_id, user_id))
-                row = cur.fetchone()
-                if not row:
-                    return resp(200, {'pending': None})
-
-                row = dict(row)
-                is_client = row['client_id'] == user_id
-                return resp(200, {
-                    'pending': {
-                        'completed_order_id': row['completed_order_id'],
-                        'order_title': row['order_title'],
-                        'reviewee_name': row['executor_name'] if is_client else row['client_name'],
-                        'reviewee_id': row['executor_id'] if is_client else row['client_id'],
-                        'role': 'client' if is_client else 'freelancer',
-                    }
-                })
+                        completed_order_id,
+                        order_title,
+                        reviewee_name,
+                        reviewee_id,
+                        role
+                    FROM {SCHEMA}.pending_reviews
+                    WHERE reviewer_id = %s
+                    ORDER BY created_at DESC
+                    LIMIT %s
+                """, (user_id, limit))
+                items = [dict(row) for row in cur.fetchall()]
+                return resp(200, {'pending': items[0] if items else None, 'items': items})
 
             reviewee_id = query_params.get('user_id')
             if not reviewee_id:
                 return resp(400, {'error': 'user_id обязателен'})
 
-            cur.execute(f"""
-                SELECT
-                    r.id, r.completed_order_id, r.rating, r.comment, r.role,
-                    r.created_at,
-                    co.title as order_title,
-                    u.name as reviewer_name,
-                    u.id as reviewer_id
-                FROM {SCHEMA}.order_reviews r
-                JOIN {SCHEMA}.completed_orders co ON r.completed_order_id = co.id
-                JOIN {SCHEMA}.users u ON r.reviewer_id = u.id
-                WHERE r.reviewee_id = %s
-                ORDER BY r.created_at DESC
-            """, (int(reviewee_id),))
-
-            reviews = [dict(row) for row in cur.fetchall()]
-            for rv in reviews:
-                if rv.get('created_at'):
-                    rv['created_at'] = rv['created_at'].isoformat()
-
-            avg_rating = None
-            if reviews:
-                avg_rating = round(sum(r['rating'] for r in reviews) / len(reviews), 2)
-
-            return resp(200, {'reviews': reviews, 'avg_rating': avg_rating, 'total': len(reviews)})
+            try:
+                limit = max(1, min(int(query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+                cursor_at, cursor_id = decode_cursor(query_params.get('cursor'))
+            except ValueError:
+                return resp(400, {'error': 'Неверный limit или cursor'})
+
+            etag = conditional.make_etag(
+                cache.versions(cur, [f'reviews:{int(reviewee_id)}']), limit, query_params.get('cursor') or ''
+            )
+            if conditional.matches(headers, etag):
+                return conditional.not_modified(etag, REVIEWS_CACHE_CONTROL)
+
+            def load_page() -> str:
+                # Страница отзывов по индексу (reviewee_id, created_at, id) и агрегаты
+                # из review_stats — за один запрос
+                cur.execute(f"""
+                    WITH page AS (
+                        SELECT
+                            r.id, r.completed_order_id, r.rating, r.comment, r.role,
+                            r.created_at,
+                            co.title as order_title,
+                            u.name as reviewer_name,
+                            u.id as reviewer_id
+                        FROM {SCHEMA}.order_reviews r
+                        JOIN {SCHEMA}.completed_orders co ON r.completed_order_id = co.id
+                        JOIN {SCHEMA}.users u ON r.reviewer_id = u.id
+                        WHERE r.reviewee_id = %(reviewee_id)s
+                          AND (%(cursor_at)s::timestamp IS NULL
+                               OR (r.created_at, r.id) < (%(cursor_at)s::timestamp, %(cursor_id)s))
+                        ORDER BY r.created_at DESC, r.id DESC
+                        LIMIT %(limit)s + 1
+                    )
+                    SELECT
+                        (SELECT COALESCE(json_agg(page ORDER BY page.created_at DESC, page.id DESC), '[]'::json)
+                         FROM page) AS reviews,
+                        (SELECT COALESCE(json_agg(s), '[]'::json)
+                         FROM (
+                             SELECT role, rating_sum, rating_count,
+                                    stars_1, stars_2, stars_3, stars_4, stars_5
+                             FROM {SCHEMA}.review_stats
+                             WHERE reviewee_id = %(reviewee_id)s
+                         ) s) AS stats
+                """, {
+                    'reviewee_id': int(reviewee_id),
+                    'cursor_at': cursor_at,
+                    'cursor_id': cursor_id,
+                    'limit': limit,
+                })
+                row = cur.fetchone()
+
+                reviews = row['reviews']
+                next_cursor = None
+                if len(reviews) > limit:
+                    reviews = reviews[:limit]
+                    next_cursor = encode_cursor(reviews[-1]['created_at'], reviews[-1]['id'])
+
+                total = sum(st['rating_count'] for st in row['stats'])
+                rating_sum = sum(st['rating_sum'] for st in row['stats'])
+                histogram = {
+                    str(star): sum(st[f'stars_{star}'] for st in row['stats'])
+                    for star in range(1, 6)
+                }
+                by_role = {
+                    st['role']: {
+                        'count': st['rating_count'],
+                        'avg_rating': round(st['rating_sum'] / st['rating_count'], 2) if st['rating_count'] else None,
+                    }
+                    for st in row['stats']
+                }
+
+                return json.dumps({
+                    'reviews': reviews,
+                    'avg_rating': round(rating_sum / total, 2) if total else None,
+                    'total': total,
+                    'histogram': histogram,
+                    'by_role': by_role,
+                    'next_cursor': next_cursor,
+                }, default=str)
+
+            body = cache.get_or_compute(
+                cur, [f'reviews:{int(reviewee_id)}'],
+                f"reviews:{int(reviewee_id)}:{limit}:{query_params.get('cursor') or ''}",
+                REVIEWS_CACHE_TTL, load_page
+            )
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    **conditional.cache_headers(etag, REVIEWS_CACHE_CONTROL)
+                },
+                'body': body
+            }
 
         if method == 'POST':
             body = json.loads(event.get('body', '{}'))
@@ -122,7 +206,7 @@ def handler(event: dict, context) -> dict:
                 return resp(400, {'error': 'Оценка должна быть от 1 до 5'})
 
             cur.execute(f"""
-                SELECT id, client_id, executor_id
+                SELECT id, order_id, client_id, executor_id
                 FROM {SCHEMA}.completed_orders
                 WHERE id = %s
             """, (int(completed_order_id),))
@@ -159,22 +243,48 @@ def handler(event: dict, context) -> dict:
 
             new_review = dict(cur.fetchone())
 
-            if role == 'client':
-                cur.execute(f"""
-                    UPDATE {SCHEMA}.freelancers f
-                    SET
-                        rating = COALESCE(stats.avg_rating, 0),
-                        total_reviews = COALESCE(stats.review_count, 0)
-                    FROM (
-                        SELECT
-                            ROUND(AVG(rating)::numeric, 2) AS avg_rating,
-                            COUNT(*) AS review_count
-                        FROM {SCHEMA}.order_reviews
-                        WHERE reviewee_id = %s AND role = 'client'
-                    ) stats
-                    WHERE f.user_id = %s
-                """, (reviewee_id, reviewee_id))
+            cur.execute(f"""
+                DELETE FROM {SCHEMA}.pending_reviews
+                WHERE reviewer_id = %s AND completed_order_id = %s
+            """, (user_id, int(completed_order_id)))
+
+            # Агрегаты обновляются прибавлением, без пересчёта по всем отзывам;
+            # рейтинг фрилансера выводится из них в том же запросе
+            stars = [1 if int(rating) == star else 0 for star in range(1, 6)]
+            cur.execute(f"""
+                WITH stats AS (
+                    INSERT INTO {SCHEMA}.review_stats AS s
+                        (reviewee_id, role, rating_sum, rating_count,
+                         stars_1, stars_2, stars_3, stars_4, stars_5)
+                    VALUES (%s, %s, %s, 1, %s, %s, %s, %s, %s)
+                    ON CONFLICT (reviewee_id, role) DO UPDATE SET
+                        rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+                        rating_count = s.rating_count + 1,
+                        stars_1 = s.stars_1 + EXCLUDED.stars_1,
+                        stars_2 = s.stars_2 + EXCLUDED.stars_2,
+                        stars_3 = s.stars_3 + EXCLUDED.stars_3,
+                        stars_4 = s.stars_4 + EXCLUDED.stars_4,
+                        stars_5 = s.stars_5 + EXCLUDED.stars_5,
+                        updated_at = NOW()
+                    RETURNING reviewee_id, role, rating_sum, rating_count
+                )
+                UPDATE {SCHEMA}.freelancers f
+                SET
+                    rating = ROUND(stats.rating_sum::numeric / stats.rating_count, 2),
+                    total_reviews = stats.rating_count,
+                    updated_at = NOW()
+                FROM stats
+                WHERE f.user_id = stats.reviewee_id AND stats.role = 'client'
+            """, (reviewee_id, role, int(rating), *stars))
 
+            cache.bump(cur, f'reviews:{reviewee_id}', 'freelancers')
+            events.emit(cur, events.REVIEW_CREATED, user_id, [(order['order_id'], {
+                'review_id': new_review['id'],
+                'completed_order_id': order['id'],
+                'reviewee_id': reviewee_id,
+                'role': role,
+                'rating': int(rating)
+            })])
             conn.commit()
             new_review['created_at'] = new_review['created_at'].isoformat()
             return resp(201, {'success': True, 'review': new_review})
@@ -1,8 +1,17 @@
 import json
 import os
+from decimal import Decimal
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+import cache
+import events
+import fastjson
+import responses
+import session
+
+MAX_BATCH_PAYEES = 1000
+
 def handler(event: dict, context) -> dict:
     '''API для управления балансом пользователей - пополнение, списание, история транзакций'''
     
@@ -14,19 +23,11 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id'
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token'
             },
             'body': ''
         }
     
-    user_id_header = event.get('headers', {}).get('X-User-Id')
-    if not user_id_header:
-        return {
-            'statusCode': 401,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Unauthorized'})
-        }
-    
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         return {
@@ -39,7 +40,14 @@ def handler(event: dict, context) -> dict:
         conn = psycopg2.connect(dsn)
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
-        user_id = int(user_id_header)
+        user_id = session.authenticate(cur, event.get('headers'))
+        if not user_id:
+            return {
+                'statusCode': 401,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Unauthorized'})
+            }
+        
         query_params = event.get('queryStringParameters') or {}
         action = query_params.get('action', 'balance')
         
@@ -84,11 +92,7 @@ def handler(event: dict, context) -> dict:
             
             transactions = cur.fetchall()
             
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'transactions': transactions}, default=str)
-            }
+            return responses.build(200, fastjson.dumps({'transactions': transactions}), event.get('headers'))
         
         if method == 'POST':
             data = json.loads(event.get('body', '{}'))
@@ -185,6 +189,10 @@ def handler(event: dict, context) -> dict:
                         SET status = 'completed' 
                         WHERE id = %s
                     """, (order_id,))
+                    events.emit(cur, events.ORDER_PAID, user_id, [
+                        (order_id, {'freelancer_id': freelancer_id, 'amount': amount})
+                    ])
+                    cache.bump(cur, 'orders')
                 
                 conn.commit()
                 
@@ -203,6 +211,144 @@ def handler(event: dict, context) -> dict:
                     })
                 }
         
+            if action == 'batch_payment':
+                payments = data.get('payments') or []
+                
+                if not isinstance(payments, list) or not payments:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'payments must be a non-empty list'})
+                    }
+                
+                if len(payments) > MAX_BATCH_PAYEES:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': f'Too many payments in one batch (max {MAX_BATCH_PAYEES})'})
+                    }
+                
+                freelancer_ids = []
+                amounts = []
+                order_ids = []
+                for index, payment in enumerate(payments):
+                    try:
+                        freelancer_id = int(payment['freelancer_id'])
+                        amount = Decimal(str(payment['amount'])).quantize(Decimal('0.01'))
+                        order_id = int(payment['order_id']) if payment.get('order_id') else None
+                    except (KeyError, TypeError, ValueError, ArithmeticError):
+                        return {
+                            'statusCode': 400,
+                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                            'body': json.dumps({'error': f'Invalid payment at index {index}'})
+                        }
+                    
+                    if amount <= 0 or freelancer_id == user_id:
+                        return {
+                            'statusCode': 400,
+                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                            'body': json.dumps({'error': f'Invalid payment at index {index}'})
+                        }
+                    
+                    freelancer_ids.append(freelancer_id)
+                    amounts.append(amount)
+                    order_ids.append(order_id)
+                
+                total = sum(amounts)
+                
+                # Списание, зачисления, проводки и закрытие заказов одним запросом:
+                # если баланса не хватает, debit пуст и остальные шаги ничего не делают
+                cur.execute("""
+                    WITH debit AS (
+                        UPDATE t_p96553691_freelance_platform_c.users 
+                        SET balance = balance - %(total)s 
+                        WHERE id = %(user_id)s AND balance >= %(total)s
+                        RETURNING balance
+                    ),
+                    payees AS (
+                        SELECT *
+                        FROM unnest(%(freelancer_ids)s::int[], %(amounts)s::numeric[], %(order_ids)s::int[])
+                            AS p(freelancer_id, amount, order_id)
+                        WHERE EXISTS (SELECT 1 FROM debit)
+                    ),
+                    credit AS (
+                        UPDATE t_p96553691_freelance_platform_c.users u
+                        SET balance = u.balance + s.amount
+                        FROM (
+                            SELECT freelancer_id, SUM(amount) AS amount
+                            FROM payees
+                            GROUP BY freelancer_id
+                        ) s
+                        WHERE u.id = s.freelancer_id
+                        RETURNING u.id
+                    ),
+                    ledger AS (
+                        INSERT INTO t_p96553691_freelance_platform_c.transactions 
+                        (user_id, type, amount, description, order_id, related_user_id)
+                        SELECT %(user_id)s, 'payment', -p.amount, 'Оплата заказа', p.order_id, p.freelancer_id
+                        FROM payees p
+                        UNION ALL
+                        SELECT p.freelancer_id, 'income', p.amount, 'Получение оплаты за заказ', p.order_id, %(user_id)s
+                        FROM payees p
+                        RETURNING 1
+                    ),
+                    closed AS (
+                        UPDATE t_p96553691_freelance_platform_c.orders 
+                        SET status = 'completed' 
+                        WHERE id IN (SELECT order_id FROM payees WHERE order_id IS NOT NULL)
+                          AND user_id = %(user_id)s
+                        RETURNING id
+                    )
+                    SELECT
+                        (SELECT balance FROM debit) AS balance,
+                        (SELECT COUNT(*) FROM credit) AS credited,
+                        (SELECT COUNT(*) FROM ledger) AS ledger_rows,
+                        (SELECT COUNT(*) FROM closed) AS closed_orders,
+                        (SELECT array_agg(id) FROM closed) AS closed_order_ids
+                """, {
+                    'user_id': user_id,
+                    'total': total,
+                    'freelancer_ids': freelancer_ids,
+                    'amounts': amounts,
+                    'order_ids': order_ids
+                })
+                result = cur.fetchone()
+                
+                if result['balance'] is None:
+                    conn.rollback()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Insufficient balance'})
+                    }
+                
+                if result['credited'] != len(set(freelancer_ids)):
+                    conn.rollback()
+                    return {
+                        'statusCode': 404,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Freelancer not found'})
+                    }
+                
+                events.emit(cur, events.ORDER_PAID, user_id, [
+                    (closed_id, {}) for closed_id in result['closed_order_ids'] or []
+                ])
+                if result['closed_order_ids']:
+                    cache.bump(cur, 'orders')
+                conn.commit()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'success': True,
+                        'balance': float(result['balance']),
+                        'paid': len(payments),
+                        'total': float(total),
+                        'completed_orders': result['closed_orders']
+                    })
+                }
+        
         return {
             'statusCode': 405,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -6,6 +6,8 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 import urllib.request
 
+import session
+
 SCHEMA = 't_p96553691_freelance_platform_c'
 
 
@@ -32,7 +34,7 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token',
                 'Access-Control-Max-Age': '86400'
             },
             'body': ''
@@ -96,8 +98,13 @@ def handler(event: dict, context) -> dict:
 
     # Создание платежа
     if method == 'POST':
-        user_id_str = headers.get('X-User-Id') or headers.get('x-user-id')
-        if not user_id_str:
+        # Соединение нужно только для проверки отзыва токена: закрываем до запроса в ЮKassa
+        conn = psycopg2.connect(os.environ['DATABASE_URL'])
+        try:
+            user_id = session.authenticate(conn.cursor(cursor_factory=RealDictCursor), headers)
+        finally:
+            conn.close()
+        if not user_id:
             return {
                 'statusCode': 401,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -120,7 +127,7 @@ def handler(event: dict, context) -> dict:
             'confirmation': {'type': 'redirect', 'return_url': return_url},
             'capture': True,
             'description': f'Пополнение счёта фриланс-платформы',
-            'metadata': {'user_id': str(user_id_str)}
+            'metadata': {'user_id': str(user_id)}
         })
 
         confirmation_url = payment.get('confirmation', {}).get('confirmation_url')
@@ -0,0 +1,12 @@
+-- Общий уровень ограничения частоты входа/регистрации (token bucket).
+-- UNLOGGED: таблица горячая и восстановима, WAL для неё не нужен.
+CREATE UNLOGGED TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.auth_rate_limits (
+    key VARCHAR(255) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    capacity DOUBLE PRECISION NOT NULL,
+    rate DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_auth_rate_limits_updated_at
+    ON t_p96553691_freelance_platform_c.auth_rate_limits(updated_at);
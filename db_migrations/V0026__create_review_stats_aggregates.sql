@@ -0,0 +1,38 @@
+-- Накопительные агрегаты отзывов: сумма, количество и гистограмма по звёздам
+-- для каждой пары (кого оценили, роль автора отзыва). Обновляются +1 при каждом отзыве.
+CREATE TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.review_stats (
+    reviewee_id INTEGER NOT NULL REFERENCES t_p96553691_freelance_platform_c.users(id),
+    role VARCHAR(20) NOT NULL CHECK (role IN ('client', 'freelancer')),
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    stars_1 INTEGER NOT NULL DEFAULT 0,
+    stars_2 INTEGER NOT NULL DEFAULT 0,
+    stars_3 INTEGER NOT NULL DEFAULT 0,
+    stars_4 INTEGER NOT NULL DEFAULT 0,
+    stars_5 INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (reviewee_id, role)
+);
+
+INSERT INTO t_p96553691_freelance_platform_c.review_stats
+    (reviewee_id, role, rating_sum, rating_count, stars_1, stars_2, stars_3, stars_4, stars_5)
+SELECT
+    reviewee_id,
+    role,
+    SUM(rating),
+    COUNT(*),
+    COUNT(*) FILTER (WHERE rating = 1),
+    COUNT(*) FILTER (WHERE rating = 2),
+    COUNT(*) FILTER (WHERE rating = 3),
+    COUNT(*) FILTER (WHERE rating = 4),
+    COUNT(*) FILTER (WHERE rating = 5)
+FROM t_p96553691_freelance_platform_c.order_reviews
+GROUP BY reviewee_id, role
+ON CONFLICT (reviewee_id, role) DO NOTHING;
+
+UPDATE t_p96553691_freelance_platform_c.freelancers f
+SET
+    rating = ROUND(s.rating_sum::numeric / s.rating_count, 2),
+    total_reviews = s.rating_count
+FROM t_p96553691_freelance_platform_c.review_stats s
+WHERE s.reviewee_id = f.user_id AND s.role = 'client' AND s.rating_count > 0;
@@ -0,0 +1,3 @@
+-- Постраничная выдача отзывов о пользователе: WHERE reviewee_id = ? ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_order_reviews_reviewee_created
+    ON t_p96553691_freelance_platform_c.order_reviews(reviewee_id, created_at DESC, id DESC);
@@ -0,0 +1,32 @@
+-- Очередь приглашений оставить отзыв: по строке на участника завершённого заказа.
+-- Заполняется при подтверждении заказа, строка удаляется при публикации отзыва.
+CREATE TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.pending_reviews (
+    reviewer_id INTEGER NOT NULL REFERENCES t_p96553691_freelance_platform_c.users(id),
+    completed_order_id INTEGER NOT NULL REFERENCES t_p96553691_freelance_platform_c.completed_orders(id),
+    reviewee_id INTEGER NOT NULL REFERENCES t_p96553691_freelance_platform_c.users(id),
+    role VARCHAR(20) NOT NULL CHECK (role IN ('client', 'freelancer')),
+    order_title VARCHAR(255) NOT NULL,
+    reviewee_name VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (reviewer_id, completed_order_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pending_reviews_reviewer_created
+    ON t_p96553691_freelance_platform_c.pending_reviews(reviewer_id, created_at DESC);
+
+INSERT INTO t_p96553691_freelance_platform_c.pending_reviews
+    (reviewer_id, completed_order_id, reviewee_id, role, order_title, reviewee_name, created_at)
+SELECT p.reviewer_id, co.id, p.reviewee_id, p.role, co.title, p.reviewee_name, co.completed_at
+FROM t_p96553691_freelance_platform_c.completed_orders co
+CROSS JOIN LATERAL (
+    VALUES
+        (co.client_id, co.executor_id, 'client', co.executor_name),
+        (co.executor_id, co.client_id, 'freelancer', co.client_name)
+) AS p(reviewer_id, reviewee_id, role, reviewee_name)
+WHERE p.reviewer_id IS NOT NULL
+  AND p.reviewee_id IS NOT NULL
+  AND NOT EXISTS (
+      SELECT 1 FROM t_p96553691_freelance_platform_c.order_reviews r
+      WHERE r.completed_order_id = co.id AND r.reviewer_id = p.reviewer_id
+  )
+ON CONFLICT (reviewer_id, completed_order_id) DO NOTHING;
@@ -0,0 +1,12 @@
+-- Денормализованное число откликов на заказ для ленты без JOIN/COUNT
+ALTER TABLE t_p96553691_freelance_platform_c.orders
+    ADD COLUMN IF NOT EXISTS response_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE t_p96553691_freelance_platform_c.orders o
+SET response_count = c.cnt
+FROM (
+    SELECT order_id, COUNT(*) AS cnt
+    FROM t_p96553691_freelance_platform_c.order_responses
+    GROUP BY order_id
+) c
+WHERE c.order_id = o.id;
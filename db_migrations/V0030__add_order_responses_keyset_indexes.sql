@@ -0,0 +1,6 @@
+-- Входящие отклики: две ветки UNION ALL с постраничной выдачей по (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_order_responses_freelancer_created
+    ON t_p96553691_freelance_platform_c.order_responses(freelancer_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_order_responses_order_created
+    ON t_p96553691_freelance_platform_c.order_responses(order_id, created_at DESC, id DESC);
@@ -0,0 +1,3 @@
+-- История выполненных работ исполнителя и пересчёт completed_projects
+CREATE INDEX IF NOT EXISTS idx_completed_orders_executor_completed
+    ON t_p96553691_freelance_platform_c.completed_orders(executor_id, completed_at DESC);
@@ -0,0 +1,3 @@
+-- История заказов клиента в профиле: WHERE client_id = ? ORDER BY completed_at DESC
+CREATE INDEX IF NOT EXISTS idx_completed_orders_client_completed
+    ON t_p96553691_freelance_platform_c.completed_orders(client_id, completed_at DESC);
@@ -0,0 +1,19 @@
+-- Мягкое удаление заказов: строка помечается deleted_at, физически удаляется фоновой очисткой
+ALTER TABLE t_p96553691_freelance_platform_c.orders
+    ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP NULL;
+
+COMMENT ON COLUMN t_p96553691_freelance_platform_c.orders.deleted_at IS 'Время удаления заказа владельцем; NULL - заказ не удалён';
+
+-- Ленты читают только неудалённые заказы
+CREATE INDEX IF NOT EXISTS idx_orders_live_status_created
+    ON t_p96553691_freelance_platform_c.orders(status, created_at DESC)
+    WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_live_user_created
+    ON t_p96553691_freelance_platform_c.orders(user_id, created_at DESC)
+    WHERE deleted_at IS NULL;
+
+-- Очередь для фоновой очистки
+CREATE INDEX IF NOT EXISTS idx_orders_deleted_at
+    ON t_p96553691_freelance_platform_c.orders(deleted_at)
+    WHERE deleted_at IS NOT NULL;
@@ -0,0 +1,11 @@
+-- Время изменения профиля фрилансера: по нему индекс подбора догружает изменения
+ALTER TABLE t_p96553691_freelance_platform_c.freelancers
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+COMMENT ON COLUMN t_p96553691_freelance_platform_c.freelancers.updated_at IS 'Время последнего изменения профиля или рейтинга';
+
+CREATE INDEX IF NOT EXISTS idx_freelancers_updated_at
+    ON t_p96553691_freelance_platform_c.freelancers(updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_orders_updated_at
+    ON t_p96553691_freelance_platform_c.orders(updated_at);
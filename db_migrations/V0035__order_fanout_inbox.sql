@@ -0,0 +1,37 @@
+-- Термы для сопоставления навыков с текстом заказа: слова в нижнем регистре, не короче 2 символов
+CREATE OR REPLACE FUNCTION t_p96553691_freelance_platform_c.skill_terms(parts TEXT[])
+RETURNS TEXT[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT COALESCE(array_agg(DISTINCT t), '{}')
+    FROM unnest(parts) AS p,
+         regexp_split_to_table(lower(COALESCE(p, '')), '[^[:alnum:]_+#]+') AS t
+    WHERE length(t) >= 2
+$$;
+
+-- Поиск фрилансеров, чьи навыки пересекаются с термами заказа (оператор &&)
+CREATE INDEX IF NOT EXISTS idx_freelancers_skill_terms
+    ON t_p96553691_freelance_platform_c.freelancers
+    USING GIN (t_p96553691_freelance_platform_c.skill_terms(skills));
+
+-- Очередь рассылки новых заказов: строка пишется в транзакции создания заказа
+-- и удаляется воркером после рассылки. last_user_id - прогресс для продолжения после сбоя.
+CREATE TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.order_fanout_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL,
+    last_user_id INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Входящие фрилансера: подходящие по навыкам новые заказы
+CREATE TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.freelancer_inbox (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES t_p96553691_freelance_platform_c.users(id),
+    order_id INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    read_at TIMESTAMP NULL,
+    UNIQUE (user_id, order_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_freelancer_inbox_user_id
+    ON t_p96553691_freelance_platform_c.freelancer_inbox(user_id, id DESC);
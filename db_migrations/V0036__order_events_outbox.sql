@@ -0,0 +1,25 @@
+-- Журнал событий жизненного цикла заказов: пишется в транзакции изменения.
+-- Позиция события - (txid, id): txid транзакции-писателя, id - порядок внутри неё
+CREATE TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.order_events (
+    id BIGSERIAL PRIMARY KEY,
+    txid BIGINT NOT NULL DEFAULT txid_current(),
+    event_type VARCHAR(64) NOT NULL,
+    order_id INTEGER,
+    actor_id INTEGER,
+    payload JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_order_events_position
+    ON t_p96553691_freelance_platform_c.order_events(txid, id);
+
+CREATE INDEX IF NOT EXISTS idx_order_events_created_at
+    ON t_p96553691_freelance_platform_c.order_events(created_at);
+
+-- Позиции потребителей журнала
+CREATE TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.event_consumers (
+    name VARCHAR(64) PRIMARY KEY,
+    last_txid BIGINT NOT NULL DEFAULT 0,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,15 @@
+-- Версии пространств имён кэша ответов: обработчики записи увеличивают их в своей транзакции
+CREATE TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.cache_versions (
+    namespace VARCHAR(128) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+-- Общий уровень кэша: содержимое можно потерять при сбое, поэтому UNLOGGED
+CREATE UNLOGGED TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.cache_entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_cache_entries_expires_at
+    ON t_p96553691_freelance_platform_c.cache_entries(expires_at);
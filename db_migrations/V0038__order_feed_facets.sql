@@ -0,0 +1,126 @@
+-- Диапазоны бюджета для фасетов ленты; границы совпадают с BUDGET_BUCKETS в get-orders
+CREATE OR REPLACE FUNCTION t_p96553691_freelance_platform_c.order_budget_bucket(budget_min INTEGER, budget_max INTEGER)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT CASE
+        WHEN COALESCE(budget_max, budget_min) IS NULL THEN 'none'
+        WHEN COALESCE(budget_max, budget_min) < 5000 THEN '0-5000'
+        WHEN COALESCE(budget_max, budget_min) < 20000 THEN '5000-20000'
+        WHEN COALESCE(budget_max, budget_min) < 50000 THEN '20000-50000'
+        WHEN COALESCE(budget_max, budget_min) < 100000 THEN '50000-100000'
+        ELSE '100000+'
+    END
+$$;
+
+-- Интервалы срока относительно текущей даты; совпадают с DEADLINE_BUCKETS в get-orders
+CREATE OR REPLACE FUNCTION t_p96553691_freelance_platform_c.order_deadline_bucket(deadline DATE)
+RETURNS TEXT
+LANGUAGE sql STABLE PARALLEL SAFE
+AS $$
+    SELECT CASE
+        WHEN deadline IS NULL THEN 'none'
+        WHEN deadline < CURRENT_DATE THEN 'overdue'
+        WHEN deadline < CURRENT_DATE + 7 THEN 'week'
+        WHEN deadline < CURRENT_DATE + 30 THEN 'month'
+        ELSE 'later'
+    END
+$$;
+
+-- Счётчики активных неудалённых заказов по категории, диапазону бюджета и дате срока.
+-- Срок хранится датой (value = 'YYYY-MM-DD', '' - без срока): интервалы сдвигаются
+-- каждый день и считаются при чтении
+CREATE TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.order_facet_counts (
+    facet VARCHAR(20) NOT NULL,
+    value VARCHAR(100) NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (facet, value)
+);
+
+COMMENT ON TABLE t_p96553691_freelance_platform_c.order_facet_counts IS 'Фасеты ленты активных заказов; ведутся триггерами на orders';
+
+-- Строки заказа -> пары (facet, value)
+CREATE OR REPLACE FUNCTION t_p96553691_freelance_platform_c.order_facet_values(
+    category VARCHAR, budget_min INTEGER, budget_max INTEGER, deadline DATE
+)
+RETURNS TABLE (facet VARCHAR, value VARCHAR)
+LANGUAGE sql STABLE PARALLEL SAFE
+AS $$
+    VALUES ('category'::VARCHAR, category),
+           ('budget'::VARCHAR, t_p96553691_freelance_platform_c.order_budget_bucket(budget_min, budget_max)::VARCHAR),
+           ('deadline'::VARCHAR, COALESCE(to_char(deadline, 'YYYY-MM-DD'), '')::VARCHAR)
+$$;
+
+-- Триггеры уровня оператора: изменения одного INSERT/UPDATE/DELETE сводятся в один
+-- upsert по затронутым счётчикам в порядке ключа. UPDATE, не меняющий участие заказа
+-- в фасетах (отклики, updated_at), даёт нулевые разности и ничего не пишет
+CREATE OR REPLACE FUNCTION t_p96553691_freelance_platform_c.order_facet_counts_apply()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO t_p96553691_freelance_platform_c.order_facet_counts AS c (facet, value, count)
+        SELECT f.facet, f.value, COUNT(*)
+        FROM new_rows r,
+             t_p96553691_freelance_platform_c.order_facet_values(r.category, r.budget_min, r.budget_max, r.deadline) f
+        WHERE r.status = 'active' AND r.deleted_at IS NULL
+        GROUP BY f.facet, f.value
+        ORDER BY f.facet, f.value
+        ON CONFLICT (facet, value) DO UPDATE SET count = c.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO t_p96553691_freelance_platform_c.order_facet_counts AS c (facet, value, count)
+        SELECT f.facet, f.value, -COUNT(*)
+        FROM old_rows r,
+             t_p96553691_freelance_platform_c.order_facet_values(r.category, r.budget_min, r.budget_max, r.deadline) f
+        WHERE r.status = 'active' AND r.deleted_at IS NULL
+        GROUP BY f.facet, f.value
+        ORDER BY f.facet, f.value
+        ON CONFLICT (facet, value) DO UPDATE SET count = c.count + EXCLUDED.count;
+    ELSE
+        INSERT INTO t_p96553691_freelance_platform_c.order_facet_counts AS c (facet, value, count)
+        SELECT f.facet, f.value, SUM(d.delta)
+        FROM (
+            SELECT 1 AS delta, category, budget_min, budget_max, deadline
+            FROM new_rows WHERE status = 'active' AND deleted_at IS NULL
+            UNION ALL
+            SELECT -1, category, budget_min, budget_max, deadline
+            FROM old_rows WHERE status = 'active' AND deleted_at IS NULL
+        ) d,
+             t_p96553691_freelance_platform_c.order_facet_values(d.category, d.budget_min, d.budget_max, d.deadline) f
+        GROUP BY f.facet, f.value
+        HAVING SUM(d.delta) <> 0
+        ORDER BY f.facet, f.value
+        ON CONFLICT (facet, value) DO UPDATE SET count = c.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS orders_facet_counts_insert ON t_p96553691_freelance_platform_c.orders;
+CREATE TRIGGER orders_facet_counts_insert
+    AFTER INSERT ON t_p96553691_freelance_platform_c.orders
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p96553691_freelance_platform_c.order_facet_counts_apply();
+
+DROP TRIGGER IF EXISTS orders_facet_counts_update ON t_p96553691_freelance_platform_c.orders;
+CREATE TRIGGER orders_facet_counts_update
+    AFTER UPDATE ON t_p96553691_freelance_platform_c.orders
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p96553691_freelance_platform_c.order_facet_counts_apply();
+
+DROP TRIGGER IF EXISTS orders_facet_counts_delete ON t_p96553691_freelance_platform_c.orders;
+CREATE TRIGGER orders_facet_counts_delete
+    AFTER DELETE ON t_p96553691_freelance_platform_c.orders
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p96553691_freelance_platform_c.order_facet_counts_apply();
+
+-- Начальное заполнение из текущих заказов
+DELETE FROM t_p96553691_freelance_platform_c.order_facet_counts;
+
+INSERT INTO t_p96553691_freelance_platform_c.order_facet_counts (facet, value, count)
+SELECT f.facet, f.value, COUNT(*)
+FROM t_p96553691_freelance_platform_c.orders o,
+     t_p96553691_freelance_platform_c.order_facet_values(o.category, o.budget_min, o.budget_max, o.deadline) f
+WHERE o.status = 'active' AND o.deleted_at IS NULL
+GROUP BY f.facet, f.value;
@@ -0,0 +1,23 @@
+-- Частичные индексы для ленты активных заказов. Условие индекса совпадает с условием
+-- ленты (status = 'active' AND deleted_at IS NULL): status приходит в запрос литералом,
+-- поэтому планировщик может выбрать эти индексы.
+--   category [+ бюджет/срок]  -> idx_orders_active_category_created, строки уже в порядке created_at
+--   только бюджет и/или срок  -> bitmap по idx_orders_active_budget_*/deadline, сортировка top-100
+--   без фильтров              -> idx_orders_live_status_created (V0033)
+CREATE INDEX IF NOT EXISTS idx_orders_active_category_created
+    ON t_p96553691_freelance_platform_c.orders(category, created_at DESC)
+    WHERE status = 'active' AND deleted_at IS NULL;
+
+-- Бюджет заказа - диапазон budget_min..budget_max: min_budget сравнивается с budget_max,
+-- max_budget - с budget_min; при обоих фильтрах индексы объединяются BitmapAnd
+CREATE INDEX IF NOT EXISTS idx_orders_active_budget_max
+    ON t_p96553691_freelance_platform_c.orders(budget_max)
+    WHERE status = 'active' AND deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_active_budget_min
+    ON t_p96553691_freelance_platform_c.orders(budget_min)
+    WHERE status = 'active' AND deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_active_deadline
+    ON t_p96553691_freelance_platform_c.orders(deadline)
+    WHERE status = 'active' AND deleted_at IS NULL;
@@ -0,0 +1,13 @@
+-- Отозванные при выходе сессионные токены; функции догружают их в память процесса.
+-- exp и revoked_at - unix-время; строки старше exp удаляются при следующем отзыве
+CREATE TABLE IF NOT EXISTS t_p96553691_freelance_platform_c.revoked_sessions (
+    jti VARCHAR(32) PRIMARY KEY,
+    exp BIGINT NOT NULL,
+    revoked_at BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_sessions_revoked_at
+    ON t_p96553691_freelance_platform_c.revoked_sessions(revoked_at);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_sessions_exp
+    ON t_p96553691_freelance_platform_c.revoked_sessions(exp);
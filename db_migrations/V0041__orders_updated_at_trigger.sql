@@ -0,0 +1,24 @@
+-- updated_at заказа ставится триггером при любом изменении полей, которые видит индекс
+-- подбора (статус, исполнитель, удаление, текст, категория, бюджет): UPDATE из
+-- order-responses и wallet не должны помнить об этом сами. Изменение только счётчика
+-- откликов updated_at не трогает
+CREATE OR REPLACE FUNCTION t_p96553691_freelance_platform_c.orders_touch_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF (NEW.status, NEW.executor_id, NEW.deleted_at, NEW.title, NEW.description, NEW.category,
+        NEW.budget_min, NEW.budget_max, NEW.deadline)
+       IS DISTINCT FROM
+       (OLD.status, OLD.executor_id, OLD.deleted_at, OLD.title, OLD.description, OLD.category,
+        OLD.budget_min, OLD.budget_max, OLD.deadline) THEN
+        NEW.updated_at := NOW();
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS orders_touch_updated_at ON t_p96553691_freelance_platform_c.orders;
+CREATE TRIGGER orders_touch_updated_at
+    BEFORE UPDATE ON t_p96553691_freelance_platform_c.orders
+    FOR EACH ROW EXECUTE FUNCTION t_p96553691_freelance_platform_c.orders_touch_updated_at();
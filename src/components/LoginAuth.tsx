@@ -5,6 +5,7 @@ import { Label } from '@/components/ui/label';
 import { useToast } from '@/hooks/use-toast';
 import Icon from '@/components/ui/icon';
 import type { UserRole } from '@/hooks/useIndexState';
+import { setSessionToken } from '@/lib/session';
 
 interface User {
   id: number;
@@ -60,6 +61,7 @@ const LoginAuth = ({ onSuccess }: LoginAuthProps) => {
       if (data.success && data.user) {
         const savedRole = isRegister ? role : ((localStorage.getItem('userRole') as UserRole) || 'client');
         localStorage.setItem('user', JSON.stringify(data.user));
+        setSessionToken(data.token);
         localStorage.setItem('userRole', savedRole);
         onSuccess(data.user, savedRole);
         toast({
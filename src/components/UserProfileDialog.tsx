@@ -66,21 +66,48 @@ const UserProfileDialog = ({
 }: UserProfileDialogProps) => {
   const [reviews, setReviews] = useState<Review[]>([]);
   const [avgRating, setAvgRating] = useState<number | null>(null);
+  const [totalReviews, setTotalReviews] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const fetchReviews = (cursor: string | null) => {
+    if (!user) return Promise.resolve(null);
+    const params = new URLSearchParams({ user_id: user.id.toString() });
+    if (cursor) params.set('cursor', cursor);
+    return fetch(`${REVIEWS_URL}?${params}`, {
+      headers: { 'X-User-Id': (currentUser?.id || user.id).toString() },
+    }).then((r) => r.json());
+  };
 
   useEffect(() => {
     if (open && user?.id) {
-      fetch(`${REVIEWS_URL}?user_id=${user.id}`, {
-        headers: { 'X-User-Id': (currentUser?.id || user.id).toString() },
-      })
-        .then((r) => r.json())
+      setReviews([]);
+      setNextCursor(null);
+      fetchReviews(null)
         .then((data) => {
+          if (!data) return;
           setReviews(data.reviews || []);
           setAvgRating(data.avg_rating ?? null);
+          setTotalReviews(data.total ?? 0);
+          setNextCursor(data.next_cursor ?? null);
         })
         .catch(() => {});
     }
   }, [open, user?.id]);
 
+  const loadMoreReviews = () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    fetchReviews(nextCursor)
+      .then((data) => {
+        if (!data) return;
+        setReviews((prev) => [...prev, ...(data.reviews || [])]);
+        setNextCursor(data.next_cursor ?? null);
+      })
+      .catch(() => {})
+      .finally(() => setLoadingMore(false));
+  };
+
   if (!user) return null;
 
   return (
@@ -104,7 +131,7 @@ const UserProfileDialog = ({
                 <div className="flex items-center gap-2 mb-2">
                   <Stars rating={Math.round(avgRating)} />
                   <span className="text-sm font-semibold">{avgRating.toFixed(1)}</span>
-                  <span className="text-sm text-muted-foreground">({reviews.length} отзыв{reviews.length === 1 ? '' : reviews.length < 5 ? 'а' : 'ов'})</span>
+                  <span className="text-sm text-muted-foreground">({totalReviews} отзыв{totalReviews === 1 ? '' : totalReviews < 5 ? 'а' : 'ов'})</span>
                 </div>
               )}
               {user.email && (
@@ -162,7 +189,7 @@ const UserProfileDialog = ({
 
           {reviews.length > 0 && (
             <div>
-              <h4 className="text-lg font-semibold mb-3">Отзывы ({reviews.length})</h4>
+              <h4 className="text-lg font-semibold mb-3">Отзывы ({totalReviews})</h4>
               <ScrollArea className="max-h-64">
                 <div className="space-y-3 pr-2">
                   {reviews.map((rv) => (
@@ -183,6 +210,17 @@ const UserProfileDialog = ({
                       </p>
                     </div>
                   ))}
+                  {nextCursor && (
+                    <Button
+                      variant="outline"
+                      size="sm"
+                      className="w-full"
+                      onClick={loadMoreReviews}
+                      disabled={loadingMore}
+                    >
+                      {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+                    </Button>
+                  )}
                 </div>
               </ScrollArea>
             </div>
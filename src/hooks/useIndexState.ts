@@ -1,6 +1,7 @@
 import { useState, useEffect, useRef } from 'react';
 import { useToast } from '@/hooks/use-toast';
 import { SortOrder } from '@/components/HeroSection';
+import { getSessionToken, setSessionToken } from '@/lib/session';
 
 export type UserRole = 'client' | 'freelancer';
 
@@ -212,7 +213,11 @@ export const useIndexState = () => {
   };
 
   const handleLogout = () => {
+    if (getSessionToken()) {
+      fetch('https://functions.poehali.dev/dc6e212b-76c3-4b8c-8484-ab127b176d7e?action=logout', { method: 'POST' }).catch(() => {});
+    }
     localStorage.removeItem('user');
+    setSessionToken(null);
     setUser(null);
   };
 
@@ -0,0 +1,49 @@
+const TOKEN_KEY = 'sessionToken';
+const TOKEN_HEADER = 'X-Auth-Token';
+// Функции из backend/func2url.json, которые проверяют X-Auth-Token.
+// Остальным (в том числе внешним) заголовок не отправляется: их CORS его не разрешает
+const AUTHENTICATED_FUNCTIONS = new Set([
+  'https://functions.poehali.dev/dc6e212b-76c3-4b8c-8484-ab127b176d7e', // auth
+  'https://functions.poehali.dev/860360d2-628f-438b-b4af-a6be44d35b25', // chat
+  'https://functions.poehali.dev/52b0f153-9486-4fff-a72b-90a2cc10eca9', // create-order
+  'https://functions.poehali.dev/1db66e23-3d86-46cc-9d5a-b7e61f16daa9', // delete-order
+  'https://functions.poehali.dev/490f681c-d260-4279-9c75-81ba262325bd', // direct-chat
+  'https://functions.poehali.dev/0db794de-963c-4ac1-9537-4f9a94d9ec66', // freelancers
+  'https://functions.poehali.dev/398a8b33-64ba-4a3b-be92-18cc1971a490', // order-responses
+  'https://functions.poehali.dev/44b24f74-a364-4f56-9258-45c0c88b94e5', // reviews
+  'https://functions.poehali.dev/d070886d-956d-4b8a-801d-eaf576bf9ccf', // wallet
+  'https://functions.poehali.dev/f3fcf6f0-c2fd-48d4-955f-fbb3abfe6ba1', // yukassa
+]);
+
+function isAuthenticatedFunction(url: string): boolean {
+  return AUTHENTICATED_FUNCTIONS.has(url.split(/[?#]/)[0].replace(/\/$/, ''));
+}
+
+export function setSessionToken(token: string | null | undefined) {
+  if (token) {
+    localStorage.setItem(TOKEN_KEY, token);
+  } else {
+    localStorage.removeItem(TOKEN_KEY);
+  }
+}
+
+export function getSessionToken(): string | null {
+  return localStorage.getItem(TOKEN_KEY);
+}
+
+export function installSessionFetch() {
+  const originalFetch = window.fetch.bind(window);
+
+  window.fetch = (input: RequestInfo | URL, init?: RequestInit) => {
+    const token = getSessionToken();
+    const url = typeof input === 'string' ? input : input instanceof URL ? input.href : input.url;
+
+    if (!token || !isAuthenticatedFunction(url)) {
+      return originalFetch(input, init);
+    }
+
+    const headers = new Headers(init?.headers ?? (input instanceof Request ? input.headers : undefined));
+    headers.set(TOKEN_HEADER, token);
+    return originalFetch(input, { ...init, headers });
+  };
+}